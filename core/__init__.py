@@ -6,5 +6,9 @@ Contains board logic, rule engine, and AI algorithms.
 from .board import Board
 from .rule_engine import RenjuRuleEngine
 from .evaluator import PositionEvaluator
+from . import profiling
 
 __all__ = ['Board', 'RenjuRuleEngine', 'PositionEvaluator']
+
+# Profiling is opt-in through OMOK_PROFILE / OMOK_PROFILE_DIR; child processes inherit it
+profiling.enable_from_environment()
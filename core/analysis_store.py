@@ -0,0 +1,179 @@
+"""
+Persistent analysis store kept in an SQLite database.
+
+Search results are saved per position so that a position analysed once
+is answered instantly in later sessions. Positions are keyed by
+Board.canonical_key and the side to move, and moves are stored in the
+canonical orientation, so symmetric positions share one entry.
+
+The database runs in WAL mode and every write is its own transaction,
+so a crash loses at most the write in progress. When the table grows
+past max_entries, the entries that were used least recently and searched
+least deeply are evicted; solver results are kept as long as possible.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Optional, Tuple
+from .board import Board, Stone
+from .patterns import cache_directory
+
+
+SCHEMA_VERSION = 1
+
+# Each ply of search depth is worth this many lookups of recency
+DEPTH_WEIGHT = 64
+
+# Eviction frees this fraction of max_entries at once
+EVICT_FRACTION = 0.1
+
+
+class AnalysisEntry:
+    """Stored analysis of a position, oriented to the board it was looked up on."""
+    
+    def __init__(self, depth: int, score: int, move: Optional[Tuple[int, int]],
+                 solver: Optional[str]):
+        self.depth = depth      # Completed search depth, 0 for solver-only results
+        self.score = score      # Score for the side to move
+        self.move = move        # Best move, or None
+        self.solver = solver    # ProofNumberSearch.WIN / LOSS when a solver decided it
+    
+    def __repr__(self) -> str:
+        return (f"AnalysisEntry(depth={self.depth}, score={self.score}, "
+                f"move={self.move}, solver={self.solver})")
+
+
+def _signed(key: int) -> int:
+    """Map a 64-bit Zobrist key onto SQLite's signed integers."""
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+class AnalysisStore:
+    """Bounded on-disk map from positions to their best known analysis."""
+    
+    def __init__(self, path: Optional[str] = None, max_entries: int = 200000):
+        """path defaults to analysis-v<SCHEMA_VERSION>.sqlite in the cache directory."""
+        if path is None:
+            path = os.path.join(cache_directory(), f'analysis-v{SCHEMA_VERSION}.sqlite')
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        
+        # The store is shared between the GUI and search threads
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        with self._lock, self._connection as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS analysis ('
+                ' key INTEGER NOT NULL,'
+                ' stone INTEGER NOT NULL,'
+                ' depth INTEGER NOT NULL,'
+                ' score INTEGER NOT NULL,'
+                ' cell INTEGER NOT NULL,'      # Canonical cell, -1 without a move
+                ' solver TEXT,'
+                ' used INTEGER NOT NULL,'      # Logical clock of the last access
+                ' PRIMARY KEY (key, stone))')
+            self._clock = connection.execute(
+                'SELECT COALESCE(MAX(used), 0) FROM analysis').fetchone()[0]
+            self._count = connection.execute('SELECT COUNT(*) FROM analysis').fetchone()[0]
+    
+    @classmethod
+    def open_default(cls) -> Optional['AnalysisStore']:
+        """
+        Open the store named by OMOK_LAB_ANALYSIS, or the default one in the
+        cache directory. Returns None if it cannot be opened.
+        """
+        try:
+            return cls(os.environ.get('OMOK_LAB_ANALYSIS') or None)
+        except (OSError, sqlite3.Error):
+            return None
+    
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def lookup(self, board: Board, stone: Stone) -> Optional[AnalysisEntry]:
+        """Get the stored analysis of the current position with stone to move, or None."""
+        key, symmetry = board.canonical_key()
+        with self._lock:
+            try:
+                with self._connection as connection:
+                    row = connection.execute(
+                        'SELECT depth, score, cell, solver FROM analysis WHERE key = ? AND stone = ?',
+                        (_signed(key), int(stone))).fetchone()
+                    if row is None:
+                        return None
+                    self._clock += 1
+                    connection.execute('UPDATE analysis SET used = ? WHERE key = ? AND stone = ?',
+                                       (self._clock, _signed(key), int(stone)))
+            except sqlite3.Error:
+                return None
+        
+        depth, score, cell, solver = row
+        move = None
+        if cell >= 0:
+            move = board.from_canonical(*divmod(cell, Board.SIZE), symmetry)
+        return AnalysisEntry(depth, score, move, solver)
+    
+    def record(self, board: Board, stone: Stone, depth: int, score: int,
+               move: Optional[Tuple[int, int]], solver: Optional[str] = None):
+        """
+        Save the analysis of the current position with stone to move.
+        A deeper search already stored is kept, and so is a solver result
+        unless a new one replaces it. Write errors are ignored; the store
+        is only a cache.
+        """
+        key, symmetry = board.canonical_key()
+        cell = -1
+        if move is not None:
+            row, col = board.to_canonical(move[0], move[1], symmetry)
+            cell = row * Board.SIZE + col
+        
+        with self._lock:
+            try:
+                with self._connection as connection:
+                    existing = connection.execute(
+                        'SELECT depth, solver FROM analysis WHERE key = ? AND stone = ?',
+                        (_signed(key), int(stone))).fetchone()
+                    self._clock += 1
+                    if existing is None:
+                        connection.execute(
+                            'INSERT INTO analysis VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            (_signed(key), int(stone), depth, score, cell, solver, self._clock))
+                        self._count += 1
+                    elif solver is not None or (existing[1] is None and depth >= existing[0]):
+                        connection.execute(
+                            'UPDATE analysis SET depth = ?, score = ?, cell = ?, solver = ?, used = ?'
+                            ' WHERE key = ? AND stone = ?',
+                            (max(depth, existing[0]), score, cell, solver or existing[1],
+                             self._clock, _signed(key), int(stone)))
+                    else:
+                        connection.execute(
+                            'UPDATE analysis SET used = ? WHERE key = ? AND stone = ?',
+                            (self._clock, _signed(key), int(stone)))
+                    
+                    if self._count > self.max_entries:
+                        self._evict(connection)
+            except sqlite3.Error:
+                pass
+    
+    def _evict(self, connection: sqlite3.Connection):
+        """
+        Delete a batch of entries, lowest recency plus depth bonus first.
+        Solver results go only once every search result is gone.
+        """
+        excess = self._count - self.max_entries + int(self.max_entries * EVICT_FRACTION)
+        connection.execute(
+            'DELETE FROM analysis WHERE rowid IN ('
+            ' SELECT rowid FROM analysis'
+            ' ORDER BY solver IS NOT NULL, used + depth * ? LIMIT ?)',
+            (DEPTH_WEIGHT, excess))
+        self._count = connection.execute('SELECT COUNT(*) FROM analysis').fetchone()[0]
@@ -4,6 +4,8 @@ Handles stone placement, move history, and board state.
 """
 
 import numpy as np
+import random
+from itertools import combinations
 from typing import List, Tuple, Optional
 from enum import IntEnum
 
@@ -15,6 +17,86 @@ class Stone(IntEnum):
     WHITE = 2
 
 
+def _make_zobrist_table(size: int, seed: int = 0x0A0B) -> List[List[int]]:
+    """
+    Build the Zobrist keys: one random 64-bit value per (cell, stone).
+    A fixed seed keeps position keys stable across runs.
+    """
+    rng = random.Random(seed)
+    return [[0, rng.getrandbits(64), rng.getrandbits(64)] for _ in range(size * size)]
+
+
+def _make_full_mask(size: int, stride: int) -> int:
+    """Bitboard with every on-board cell set (guard bits left clear)."""
+    row_mask = (1 << size) - 1
+    return sum(row_mask << (row * stride) for row in range(size))
+
+
+def _make_neighbour_table(size: int, stride: int, distance: int) -> List[List[Tuple[int, int]]]:
+    """
+    For every cell index, the (cell index, bitboard index) pairs of the
+    other cells within the given distance.
+    """
+    table = []
+    for row in range(size):
+        for col in range(size):
+            table.append([
+                (r * size + c, r * stride + c)
+                for r in range(max(0, row - distance), min(size, row + distance + 1))
+                for c in range(max(0, col - distance), min(size, col + distance + 1))
+                if (r, c) != (row, col)
+            ])
+    return table
+
+
+def _make_symmetry_tables(size: int) -> Tuple[List[List[int]], List[List[int]]]:
+    """
+    Cell index permutations for the eight rotations and reflections of the
+    board, and their inverses. Symmetry 0 is the identity.
+    """
+    last = size - 1
+    transforms = [
+        lambda r, c: (r, c),
+        lambda r, c: (c, last - r),
+        lambda r, c: (last - r, last - c),
+        lambda r, c: (last - c, r),
+        lambda r, c: (r, last - c),
+        lambda r, c: (last - r, c),
+        lambda r, c: (c, r),
+        lambda r, c: (last - c, last - r),
+    ]
+    
+    forward = []
+    inverse = []
+    for transform in transforms:
+        table = [0] * (size * size)
+        back = [0] * (size * size)
+        for row in range(size):
+            for col in range(size):
+                r, c = transform(row, col)
+                table[row * size + col] = r * size + c
+                back[r * size + c] = row * size + col
+        forward.append(table)
+        inverse.append(back)
+    return forward, inverse
+
+
+def _make_symmetry_zobrist(zobrist: List[List[int]], symmetries: List[List[int]]) -> List[List[int]]:
+    """
+    For every (cell, stone), the Zobrist keys of the transformed cell under
+    all eight symmetries packed into one integer, 64 bits per symmetry, so
+    a single XOR updates every symmetric key at once.
+    """
+    table = []
+    for index in range(len(zobrist)):
+        packed = [0, 0, 0]
+        for symmetry, cells in enumerate(symmetries):
+            for stone in (Stone.BLACK, Stone.WHITE):
+                packed[stone] |= zobrist[cells[index]][stone] << (64 * symmetry)
+        table.append(packed)
+    return table
+
+
 class Move:
     """Represents a single move in the game."""
     
@@ -51,10 +133,38 @@ class Board:
         (1, 1),   # Diagonal \
         (1, -1),  # Diagonal /
     ]
+    ZOBRIST = _make_zobrist_table(SIZE)
+    
+    # The eight rotations and reflections as cell index permutations
+    SYMMETRIES, INVERSE_SYMMETRIES = _make_symmetry_tables(SIZE)
+    SYMMETRY_ZOBRIST = _make_symmetry_zobrist(ZOBRIST, SYMMETRIES)
+    KEY_MASK = (1 << 64) - 1
+    
+    # Bitboard layout: cell (row, col) is bit row * STRIDE + col. Column 15 of
+    # every row is a guard bit that is never set, so shifting along any
+    # direction cannot run from one line into the next.
+    STRIDE = SIZE + 1
+    SHIFTS = {
+        (0, 1): 1,
+        (1, 0): STRIDE,
+        (1, 1): STRIDE + 1,
+        (1, -1): STRIDE - 1,
+    }
+    FULL_MASK = _make_full_mask(SIZE, STRIDE)
+    
+    # Empty cells within this many rows/columns of a stone are move candidates
+    NEIGHBOURHOOD = 2
+    NEIGHBOURS = _make_neighbour_table(SIZE, STRIDE, NEIGHBOURHOOD)
     
     def __init__(self):
         """Initialize an empty 15x15 board."""
         self.grid = np.zeros((self.SIZE, self.SIZE), dtype=int)
+        self.bitboards = [0, 0, 0]  # Indexed by Stone; EMPTY is unused
+        self.zobrist_key = 0
+        self.symmetry_keys = 0  # Zobrist keys of all eight symmetric boards, 64 bits each
+        self.near_counts = [0] * (self.SIZE * self.SIZE)  # Stones in each cell's neighbourhood
+        self.candidates = set()  # Indices of empty cells with a nonzero near count
+        self.listeners = []
         self.move_history: List[Move] = []
         self.current_player = Stone.BLACK
         self.winner: Optional[Stone] = None
@@ -64,11 +174,31 @@ class Board:
     def reset(self):
         """Reset the board to initial state."""
         self.grid = np.zeros((self.SIZE, self.SIZE), dtype=int)
+        self.bitboards = [0, 0, 0]
+        self.zobrist_key = 0
+        self.symmetry_keys = 0
+        self.near_counts = [0] * (self.SIZE * self.SIZE)
+        self.candidates = set()
         self.move_history.clear()
         self.current_player = Stone.BLACK
         self.winner = None
         self.game_over = False
         self.winning_line.clear()
+        
+        for listener in self.listeners:
+            listener.on_reset()
+    
+    def add_listener(self, listener):
+        """
+        Register an object to be told about every cell change.
+        Listeners implement on_cell_changed(row, col, old, new) and on_reset().
+        """
+        self.listeners.append(listener)
+    
+    def remove_listener(self, listener):
+        """Stop notifying a listener."""
+        if listener in self.listeners:
+            self.listeners.remove(listener)
     
     def is_valid_position(self, row: int, col: int) -> bool:
         """Check if position is within board bounds."""
@@ -76,7 +206,10 @@ class Board:
     
     def is_empty(self, row: int, col: int) -> bool:
         """Check if position is empty."""
-        return self.is_valid_position(row, col) and self.grid[row, col] == Stone.EMPTY
+        if not self.is_valid_position(row, col):
+            return False
+        occupied = self.bitboards[Stone.BLACK] | self.bitboards[Stone.WHITE]
+        return not occupied >> (row * self.STRIDE + col) & 1
     
     def place_stone(self, row: int, col: int, stone: Stone, time_taken: float = 0.0) -> bool:
         """
@@ -86,7 +219,7 @@ class Board:
         if not self.is_empty(row, col) or self.game_over:
             return False
         
-        self.grid[row, col] = stone
+        self._set_cell(row, col, stone)
         move = Move(row, col, stone, len(self.move_history) + 1, time_taken)
         self.move_history.append(move)
         
@@ -106,7 +239,7 @@ class Board:
             return False
         
         last_move = self.move_history.pop()
-        self.grid[last_move.row, last_move.col] = Stone.EMPTY
+        self._set_cell(last_move.row, last_move.col, Stone.EMPTY)
         self.current_player = last_move.stone
         self.winner = None
         self.game_over = False
@@ -114,6 +247,71 @@ class Board:
         
         return True
     
+    def make_move(self, row: int, col: int, stone: Stone):
+        """
+        Place a stone while searching.
+        Unlike place_stone, no history, turn or win bookkeeping is done.
+        """
+        self._set_cell(row, col, stone)
+    
+    def unmake_move(self, row: int, col: int):
+        """Take back a stone placed with make_move."""
+        self._set_cell(row, col, Stone.EMPTY)
+    
+    def _set_cell(self, row: int, col: int, stone: Stone):
+        """Write a cell, keep the bitboards and Zobrist key in sync and notify listeners."""
+        old = int(self.grid[row, col])
+        keys = self.ZOBRIST[row * self.SIZE + col]
+        self.zobrist_key ^= keys[old] ^ keys[stone]
+        keys = self.SYMMETRY_ZOBRIST[row * self.SIZE + col]
+        self.symmetry_keys ^= keys[old] ^ keys[stone]
+        self.grid[row, col] = stone
+        
+        bit = 1 << (row * self.STRIDE + col)
+        if old != Stone.EMPTY:
+            self.bitboards[old] &= ~bit
+        if stone != Stone.EMPTY:
+            self.bitboards[stone] |= bit
+        
+        # Stone.EMPTY is 0, so truth tests stand in for enum comparisons here
+        if bool(old) != bool(stone):
+            self._update_candidates(row * self.SIZE + col, bool(stone))
+        
+        for listener in self.listeners:
+            listener.on_cell_changed(row, col, old, stone)
+    
+    def _update_candidates(self, index: int, placed: bool):
+        """Adjust the neighbourhood counts after a stone is placed on or removed from a cell."""
+        counts = self.near_counts
+        candidates = self.candidates
+        
+        if placed:
+            candidates.discard(index)
+            occupied = self.bitboards[Stone.BLACK] | self.bitboards[Stone.WHITE]
+            for neighbour, bit_index in self.NEIGHBOURS[index]:
+                counts[neighbour] += 1
+                if counts[neighbour] == 1 and not occupied >> bit_index & 1:
+                    candidates.add(neighbour)
+        else:
+            for neighbour, _ in self.NEIGHBOURS[index]:
+                counts[neighbour] -= 1
+                if counts[neighbour] == 0:
+                    candidates.discard(neighbour)
+            if counts[index]:
+                candidates.add(index)
+    
+    def get_candidate_positions(self) -> List[Tuple[int, int]]:
+        """
+        Get the empty positions within NEIGHBOURHOOD of any stone, in row-major order.
+        The set is maintained on every move, so this costs time proportional
+        to the number of candidates rather than the board area.
+        """
+        return [divmod(index, self.SIZE) for index in sorted(self.candidates)]
+    
+    def has_nearby_stone(self, row: int, col: int) -> bool:
+        """Check if there's any stone within NEIGHBOURHOOD of the position."""
+        return self.near_counts[row * self.SIZE + col] > 0
+    
     def get_stone(self, row: int, col: int) -> Stone:
         """Get the stone at the given position."""
         if not self.is_valid_position(row, col):
@@ -122,11 +320,16 @@ class Board:
     
     def get_empty_positions(self) -> List[Tuple[int, int]]:
         """Get all empty positions on the board."""
+        empty = self.FULL_MASK & ~(self.bitboards[Stone.BLACK] | self.bitboards[Stone.WHITE])
+        return self.mask_positions(empty)
+    
+    def mask_positions(self, mask: int) -> List[Tuple[int, int]]:
+        """List the positions of the bits set in a bitboard, in row-major order."""
         positions = []
-        for row in range(self.SIZE):
-            for col in range(self.SIZE):
-                if self.grid[row, col] == Stone.EMPTY:
-                    positions.append((row, col))
+        while mask:
+            low = mask & -mask
+            positions.append(divmod(low.bit_length() - 1, self.STRIDE))
+            mask ^= low
         return positions
     
     def count_consecutive(self, row: int, col: int, stone: Stone, 
@@ -135,47 +338,127 @@ class Board:
         Count consecutive stones in a given direction.
         Returns total count including the stone at (row, col).
         """
-        dr, dc = direction
+        bits = self.bitboards[stone]
+        shift = self.SHIFTS[direction]
+        index = row * self.STRIDE + col
         count = 1  # Count the stone at (row, col)
         
         # Count in positive direction
-        r, c = row + dr, col + dc
-        while self.is_valid_position(r, c) and self.grid[r, c] == stone:
+        i = index + shift
+        while bits >> i & 1:
             count += 1
-            r += dr
-            c += dc
+            i += shift
         
         # Count in negative direction
-        r, c = row - dr, col - dc
-        while self.is_valid_position(r, c) and self.grid[r, c] == stone:
+        i = index - shift
+        while i >= 0 and bits >> i & 1:
             count += 1
-            r -= dr
-            c -= dc
+            i -= shift
         
         return count
     
+    def is_run_open(self, row: int, col: int, stone: Stone,
+                    direction: Tuple[int, int]) -> bool:
+        """Check if the run of stones through (row, col) has both ends empty."""
+        bits = self.bitboards[stone]
+        empty = self.FULL_MASK & ~(self.bitboards[Stone.BLACK] | self.bitboards[Stone.WHITE])
+        shift = self.SHIFTS[direction]
+        index = row * self.STRIDE + col
+        
+        i = index + shift
+        while bits >> i & 1:
+            i += shift
+        if not empty >> i & 1:
+            return False
+        
+        i = index - shift
+        while i >= 0 and bits >> i & 1:
+            i -= shift
+        return i >= 0 and bool(empty >> i & 1)
+    
     def get_line_stones(self, row: int, col: int, stone: Stone, 
                        direction: Tuple[int, int]) -> List[Tuple[int, int]]:
         """Get all positions of consecutive stones in a direction."""
-        dr, dc = direction
+        bits = self.bitboards[stone]
+        shift = self.SHIFTS[direction]
+        index = row * self.STRIDE + col
         positions = [(row, col)]
         
         # Positive direction
-        r, c = row + dr, col + dc
-        while self.is_valid_position(r, c) and self.grid[r, c] == stone:
-            positions.append((r, c))
-            r += dr
-            c += dc
+        i = index + shift
+        while bits >> i & 1:
+            positions.append(divmod(i, self.STRIDE))
+            i += shift
         
         # Negative direction
-        r, c = row - dr, col - dc
-        while self.is_valid_position(r, c) and self.grid[r, c] == stone:
-            positions.append((r, c))
-            r -= dr
-            c -= dc
+        i = index - shift
+        while i >= 0 and bits >> i & 1:
+            positions.append(divmod(i, self.STRIDE))
+            i -= shift
         
         return positions
     
+    def threat_mask(self, stone: Stone, missing: int) -> int:
+        """
+        Bitboard of the empty cells that complete a five-cell window holding
+        5 - missing stones of the given colour and no other stones.
+        missing=1 gives the cells that make five (before overline checks),
+        missing=2 the cells that make a four.
+        """
+        own = self.bitboards[stone]
+        empty = self.FULL_MASK & ~(self.bitboards[Stone.BLACK] | self.bitboards[Stone.WHITE])
+        
+        result = 0
+        for shift in self.SHIFTS.values():
+            for holes in combinations(range(5), missing):
+                # Bits at the start of every window with the right shape
+                starts = self.FULL_MASK
+                for step in range(5):
+                    starts &= (empty if step in holes else own) >> (step * shift)
+                    if not starts:
+                        break
+                for step in holes:
+                    result |= starts << (step * shift)
+        
+        return result & empty
+    
+    def open_four_mask(self, stone: Stone) -> int:
+        """
+        Bitboard of the empty cells that turn three stones into an open four
+        (_XXXX_ with both ends empty). For black the ends may not be followed by
+        another black stone, since that would only give an overline.
+        """
+        own = self.bitboards[stone]
+        empty = self.FULL_MASK & ~(self.bitboards[Stone.BLACK] | self.bitboards[Stone.WHITE])
+        
+        result = 0
+        for shift in self.SHIFTS.values():
+            # Windows of six cells with both ends empty
+            ends = self.FULL_MASK & empty & (empty >> (5 * shift))
+            if stone == Stone.BLACK:
+                ends &= ~(own << shift) & ~(own >> (6 * shift))
+            
+            for hole in range(1, 5):
+                starts = ends
+                for step in range(1, 5):
+                    starts &= (empty if step == hole else own) >> (step * shift)
+                    if not starts:
+                        break
+                result |= starts << (hole * shift)
+        
+        return result & empty
+    
+    def has_run(self, stone: Stone, length: int) -> bool:
+        """Check with shift/mask operations if the stone has length or more in a row anywhere."""
+        bits = self.bitboards[stone]
+        for shift in self.SHIFTS.values():
+            run = bits
+            for step in range(1, length):
+                run &= bits >> (step * shift)
+            if run:
+                return True
+        return False
+    
     def _check_win(self, row: int, col: int, stone: Stone) -> bool:
         """Check if the last move resulted in a win."""
         for direction in self.DIRECTIONS:
@@ -197,6 +480,11 @@ class Board:
         """Create a deep copy of the board."""
         new_board = Board()
         new_board.grid = self.grid.copy()
+        new_board.bitboards = self.bitboards.copy()
+        new_board.zobrist_key = self.zobrist_key
+        new_board.symmetry_keys = self.symmetry_keys
+        new_board.near_counts = self.near_counts.copy()
+        new_board.candidates = self.candidates.copy()
         new_board.move_history = self.move_history.copy()
         new_board.current_player = self.current_player
         new_board.winner = self.winner
@@ -204,6 +492,55 @@ class Board:
         new_board.winning_line = self.winning_line.copy()
         return new_board
     
+    def key_after(self, row: int, col: int, stone: Stone) -> int:
+        """Zobrist key the position would have after placing stone on an empty cell."""
+        keys = self.ZOBRIST[row * self.SIZE + col]
+        return self.zobrist_key ^ keys[Stone.EMPTY] ^ keys[stone]
+    
+    def canonical_key(self) -> Tuple[int, int]:
+        """
+        Return (key, symmetry): the smallest Zobrist key among the eight
+        rotations and reflections of the position, and the symmetry that
+        gives it. Every symmetric variant of a position has the same key.
+        Moves map into that orientation with to_canonical and back with
+        from_canonical.
+        """
+        packed = self.symmetry_keys
+        best_key = packed & self.KEY_MASK
+        best_symmetry = 0
+        for symmetry in range(1, 8):
+            key = (packed >> (64 * symmetry)) & self.KEY_MASK
+            if key < best_key:
+                best_key = key
+                best_symmetry = symmetry
+        return best_key, best_symmetry
+    
+    def to_canonical(self, row: int, col: int, symmetry: int) -> Tuple[int, int]:
+        """Map a move on this board into the canonical orientation."""
+        return divmod(self.SYMMETRIES[symmetry][row * self.SIZE + col], self.SIZE)
+    
+    def from_canonical(self, row: int, col: int, symmetry: int) -> Tuple[int, int]:
+        """Map a move in the canonical orientation back onto this board."""
+        return divmod(self.INVERSE_SYMMETRIES[symmetry][row * self.SIZE + col], self.SIZE)
+    
+    def encode(self) -> Tuple[int, int]:
+        """
+        Compact encoding of the stones: the black and white bitboards.
+        Much cheaper to send to another process than a pickled Board.
+        """
+        return self.bitboards[Stone.BLACK], self.bitboards[Stone.WHITE]
+    
+    def decode(self, encoded: Tuple[int, int]):
+        """
+        Replace the stones with an encoding made by encode().
+        Listeners are reset and then told about every stone; move history,
+        turn and winner are cleared as after reset().
+        """
+        self.reset()
+        for stone, bits in zip((Stone.BLACK, Stone.WHITE), encoded):
+            for row, col in self.mask_positions(bits):
+                self._set_cell(row, col, stone)
+    
     def __str__(self) -> str:
         """String representation of the board."""
         lines = []
@@ -0,0 +1,200 @@
+"""
+Long-lived search service.
+One background thread owns a single search engine and works through a
+queue of jobs, so the transposition table, move ordering tables and
+evaluator state carry over from one move to the next. Every job carries
+the ID of the position it was asked for; a newer job supersedes all
+earlier ones, which are cancelled and never report a result.
+"""
+
+from typing import Callable, List, Optional, Tuple
+from .board import Board, Stone
+from .minimax import MinimaxAI, SearchStats
+from .parallel import ParallelMinimaxAI
+from .opening_book import OpeningBook
+from .analysis_store import AnalysisStore
+import queue
+import threading
+
+
+class SearchJob:
+    """
+    One search request. Also the cancellation token the engine checks
+    while searching.
+    """
+    
+    def __init__(self, position_id: int, board: Board, stone: Stone,
+                 ponder_move: Optional[Tuple[int, int]] = None):
+        """
+        With ponder_move, the opponent's predicted reply is added to the
+        position and the search runs without a deadline; its result is held
+        back until EngineService.ponderhit() confirms the prediction.
+        """
+        self.position_id = position_id
+        self.stone = stone
+        self.ponder_move = ponder_move
+        self.pondering = ponder_move is not None
+        self.cancelled = False
+        self.result: Optional[Tuple[int, int, int]] = None
+        self.stats: Optional[SearchStats] = None
+        self.predicted_reply: Optional[Tuple[int, int]] = None
+        
+        black, white = board.encode()
+        if ponder_move is not None:
+            bit = 1 << (ponder_move[0] * Board.STRIDE + ponder_move[1])
+            if stone == Stone.BLACK:
+                white |= bit
+            else:
+                black |= bit
+        self.encoded = (black, white)
+        
+        # Set once the result may be reported
+        self._released = threading.Event()
+        if not self.pondering:
+            self._released.set()
+    
+    def cancel(self):
+        """Drop the job; a running search stops at its next clock check."""
+        self.cancelled = True
+        self._released.set()
+    
+    def __repr__(self) -> str:
+        return (f"SearchJob(position={self.position_id}, stone={self.stone.name}, "
+                f"ponder={self.ponder_move}, cancelled={self.cancelled})")
+
+
+class SolveJob(SearchJob):
+    """
+    A forced-win (VCT) search for the side to move, run on the engine
+    thread so the caller is never blocked by the solver.
+    """
+    
+    def __init__(self, position_id: int, board: Board, stone: Stone):
+        super().__init__(position_id, board, stone)
+        self.line: Optional[List[Tuple[int, int]]] = None
+    
+    def __repr__(self) -> str:
+        return (f"SolveJob(position={self.position_id}, stone={self.stone.name}, "
+                f"cancelled={self.cancelled})")
+
+
+class EngineService:
+    """Background thread running SearchJobs on one persistent engine."""
+    
+    def __init__(self, max_depth: int = 10, time_limit: float = 5.0,
+                 book: Optional[OpeningBook] = None, store: Optional[AnalysisStore] = None,
+                 workers: int = 1, on_result: Optional[Callable[[SearchJob], None]] = None):
+        """
+        on_result is called from the engine thread with each finished job
+        that was not cancelled. More than one worker selects root-parallel search.
+        """
+        self.board = Board()
+        if workers > 1:
+            self.ai = ParallelMinimaxAI(self.board, max_depth, time_limit,
+                                        book=book, store=store, workers=workers)
+        else:
+            self.ai = MinimaxAI(self.board, max_depth, time_limit, book=book, store=store)
+        self.on_result = on_result
+        
+        self._lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue()
+        self._outstanding: List[SearchJob] = []
+        self._running: Optional[SearchJob] = None
+        self._thread = threading.Thread(target=self._run, name='omok-engine', daemon=True)
+        self._thread.start()
+    
+    def submit(self, job: SearchJob) -> SearchJob:
+        """Queue a job, cancelling every earlier one."""
+        with self._lock:
+            self._cancel_outstanding()
+            self._outstanding.append(job)
+        self._queue.put(job)
+        return job
+    
+    def cancel(self, job: Optional[SearchJob] = None):
+        """Cancel one job, or every queued and running job."""
+        with self._lock:
+            if job is None:
+                self._cancel_outstanding()
+            elif job in self._outstanding:
+                self._outstanding.remove(job)
+                self._cancel(job)
+    
+    def ponderhit(self, job: SearchJob, position_id: int):
+        """
+        The predicted reply of a pondering job was played: the job now
+        belongs to position_id and finishes within the normal time limit.
+        """
+        with self._lock:
+            job.position_id = position_id
+            job.pondering = False
+            if job is self._running:
+                self.ai.ponderhit()
+            job._released.set()
+    
+    def shutdown(self):
+        """Cancel all work and stop the engine thread."""
+        self.cancel()
+        self._queue.put(None)
+        self._thread.join()
+    
+    def _cancel_outstanding(self):
+        """Cancel every job not yet finished. The lock must be held."""
+        for job in self._outstanding:
+            self._cancel(job)
+        self._outstanding.clear()
+    
+    def _cancel(self, job: SearchJob):
+        """Cancel a job, stopping the engine if it is running. The lock must be held."""
+        job.cancel()
+        if job is self._running:
+            self.ai.stop()
+    
+    def _run(self):
+        """Engine thread: run jobs until shutdown() queues None."""
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            
+            with self._lock:
+                if job.cancelled:
+                    continue
+                self._running = job
+                self.ai.cancel_token = job
+                self.ai.pondering = job.pondering
+            
+            self._sync_board(job.encoded)
+            if isinstance(job, SolveJob):
+                job.line = self.ai.solve_threats(job.stone)
+            else:
+                result, job.stats = self.ai.get_best_move(job.stone, with_stats=True)
+                if result is not None:
+                    job.result = result
+                    job.predicted_reply = self.ai.predicted_reply(result[0], result[1], job.stone)
+            
+            # A pondering job waits for ponderhit() or cancel()
+            job._released.wait()
+            with self._lock:
+                self._running = None
+                self.ai.cancel_token = None
+                if job in self._outstanding:
+                    self._outstanding.remove(job)
+                report = not job.cancelled
+            
+            if report and self.on_result is not None:
+                self.on_result(job)
+    
+    def _sync_board(self, encoded: Tuple[int, int]):
+        """
+        Bring the engine's board to the job's position by changing only the
+        cells that differ, keeping the incremental evaluators warm.
+        """
+        board = self.board
+        stones = (Stone.BLACK, Stone.WHITE)
+        for stone, target in zip(stones, encoded):
+            for row, col in board.mask_positions(board.bitboards[stone] & ~target):
+                board.unmake_move(row, col)
+        for stone, target in zip(stones, encoded):
+            for row, col in board.mask_positions(target & ~board.bitboards[stone]):
+                board.make_move(row, col, stone)
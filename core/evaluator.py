@@ -3,9 +3,42 @@ Position evaluator for AI analysis.
 Evaluates board positions and calculates win probability.
 """
 
-from typing import Tuple
+from typing import List, Tuple
 from .board import Board, Stone
+from . import patterns
 import math
+import numpy as np
+
+
+def _build_lines() -> Tuple[List[List[Tuple[int, int]]], List[List[Tuple[int, int]]]]:
+    """
+    Enumerate every row, column and diagonal of the board.
+    Returns the cells of each line and, for each cell, the
+    (line index, position in line) pairs of the four lines through it.
+    """
+    lines = []
+    cell_lines = [[] for _ in range(Board.SIZE * Board.SIZE)]
+    
+    for dr, dc in Board.DIRECTIONS:
+        for row in range(Board.SIZE):
+            for col in range(Board.SIZE):
+                # Only start a line at a cell with no predecessor
+                if Board.SIZE > row - dr >= 0 and Board.SIZE > col - dc >= 0:
+                    continue
+                
+                cells = []
+                r, c = row, col
+                while 0 <= r < Board.SIZE and 0 <= c < Board.SIZE:
+                    cell_lines[r * Board.SIZE + c].append((len(lines), len(cells)))
+                    cells.append((r, c))
+                    r += dr
+                    c += dc
+                lines.append(cells)
+    
+    return lines, cell_lines
+
+
+LINES, CELL_LINES = _build_lines()
 
 
 class PositionEvaluator:
@@ -20,8 +53,147 @@ class PositionEvaluator:
     OPEN_TWO = 50      # Open two
     TWO = 10           # Two in a row (one end blocked)
     
-    def __init__(self, board: Board):
+    # Win probability is sigmoid(score / WIN_PROBABILITY_SCALE)
+    WIN_PROBABILITY_SCALE = 1000.0
+    
+    # Rows evaluated together by evaluate_batch, to bound memory use
+    BATCH_CHUNK = 2048
+    
+    def __init__(self, board: Board, incremental: bool = False):
+        """
+        In incremental mode the evaluator listens to board changes and keeps
+        a score per line, so evaluate() no longer rescans the board.
+        """
         self.board = board
+        self.incremental = incremental
+        
+        # Score of each shape class from the shared pattern tables
+        self._shape_scores = [0] * (patterns.SHAPE_FIVE + 1)
+        self._shape_scores[patterns.SHAPE_TWO] = self.TWO
+        self._shape_scores[patterns.SHAPE_OPEN_TWO] = self.OPEN_TWO
+        self._shape_scores[patterns.SHAPE_THREE] = self.THREE
+        self._shape_scores[patterns.SHAPE_OPEN_THREE] = self.OPEN_THREE
+        self._shape_scores[patterns.SHAPE_FOUR] = self.FOUR
+        self._shape_scores[patterns.SHAPE_OPEN_FOUR] = self.OPEN_FOUR
+        self._shape_scores[patterns.SHAPE_FIVE] = self.FIVE
+        
+        if incremental:
+            self._run_scores = {
+                (count, is_open): self._run_score(count, is_open)
+                for count in range(1, Board.SIZE + 1) for is_open in (False, True)
+            }
+            self._rebuild()
+            board.add_listener(self)
+    
+    def _rebuild(self):
+        """Score every line from scratch."""
+        self._line_values = [[int(self.board.grid[r, c]) for r, c in cells] for cells in LINES]
+        self._line_scores = [[0, 0, 0] for _ in LINES]
+        self._pattern_totals = [0, 0, 0]
+        self._position_totals = [0, 0, 0]
+        
+        for index, values in enumerate(self._line_values):
+            for stone in (Stone.BLACK, Stone.WHITE):
+                line_score = self._score_line(values, stone)
+                self._line_scores[index][stone] = line_score
+                self._pattern_totals[stone] += line_score
+        
+        center = Board.SIZE // 2
+        for row in range(Board.SIZE):
+            for col in range(Board.SIZE):
+                stone = self.board.grid[row, col]
+                if stone != Stone.EMPTY:
+                    self._position_totals[stone] += max(0, 10 - abs(row - center) - abs(col - center))
+    
+    def detach(self):
+        """Stop listening to the board; evaluate() goes back to full scans."""
+        if self.incremental:
+            self.board.remove_listener(self)
+            self.incremental = False
+    
+    def on_reset(self):
+        """Board listener: the board was cleared."""
+        self._rebuild()
+    
+    def on_cell_changed(self, row: int, col: int, old: int, new: int):
+        """Board listener: rescore only the four lines through the changed cell."""
+        center = Board.SIZE // 2
+        bonus = max(0, 10 - abs(row - center) - abs(col - center))
+        if old != Stone.EMPTY:
+            self._position_totals[old] -= bonus
+        if new != Stone.EMPTY:
+            self._position_totals[new] += bonus
+        
+        for index, position in CELL_LINES[row * Board.SIZE + col]:
+            values = self._line_values[index]
+            values[position] = new
+            line_scores = self._line_scores[index]
+            for stone in (Stone.BLACK, Stone.WHITE):
+                line_score = self._score_line(values, stone)
+                self._pattern_totals[stone] += line_score - line_scores[stone]
+                line_scores[stone] = line_score
+    
+    def move_delta(self, row: int, col: int, stone: Stone,
+                   perspective: Stone = None) -> int:
+        """
+        Change in evaluate(perspective) if stone were played at the empty cell
+        (row, col). Only the four lines through the cell are rescored and the
+        board is left untouched. Requires incremental mode.
+        perspective defaults to the stone being played.
+        """
+        if perspective is None:
+            perspective = stone
+        opponent = Stone.WHITE if perspective == Stone.BLACK else Stone.BLACK
+        
+        delta = 0
+        for index, position in CELL_LINES[row * Board.SIZE + col]:
+            values = self._line_values[index]
+            line_scores = self._line_scores[index]
+            values[position] = stone
+            delta += self._score_line(values, perspective) - line_scores[perspective]
+            delta -= self._score_line(values, opponent) - line_scores[opponent]
+            values[position] = Stone.EMPTY
+        
+        if stone == perspective:
+            center = Board.SIZE // 2
+            delta += max(0, 10 - abs(row - center) - abs(col - center))
+        
+        return delta
+    
+    def _score_line(self, values: List[int], stone: int) -> int:
+        """
+        Score one line for the given stone.
+        Every stone of a run scores the run's pattern, exactly as
+        _evaluate_position does, so a run of n stones counts n times.
+        """
+        score = 0
+        size = len(values)
+        i = 0
+        while i < size:
+            if values[i] != stone:
+                i += 1
+                continue
+            
+            start = i
+            while i < size and values[i] == stone:
+                i += 1
+            
+            is_open = start > 0 and i < size and values[start - 1] == 0 and values[i] == 0
+            score += self._run_scores[(i - start, is_open)]
+        
+        return score
+    
+    def _run_score(self, count: int, is_open: bool) -> int:
+        """Total score of a run of count stones (each stone scores the pattern)."""
+        if count >= 5:
+            return count * self.FIVE
+        if count == 4:
+            return count * (self.OPEN_FOUR if is_open else self.FOUR)
+        if count == 3:
+            return count * (self.OPEN_THREE if is_open else self.THREE)
+        if count == 2:
+            return count * (self.OPEN_TWO if is_open else self.TWO)
+        return 0
     
     def evaluate(self, perspective: Stone = Stone.BLACK) -> int:
         """
@@ -35,9 +207,14 @@ class PositionEvaluator:
             elif self.board.winner is not None:
                 return -self.FIVE
         
-        score = 0
         opponent = Stone.WHITE if perspective == Stone.BLACK else Stone.BLACK
         
+        if self.incremental:
+            return (self._pattern_totals[perspective] - self._pattern_totals[opponent]
+                    + self._position_totals[perspective])
+        
+        score = 0
+        
         # Evaluate all positions
         for row in range(Board.SIZE):
             for col in range(Board.SIZE):
@@ -55,61 +232,17 @@ class PositionEvaluator:
         """Evaluate a single stone position."""
         score = 0
         
-        for direction in Board.DIRECTIONS:
-            pattern_score = self._evaluate_direction(row, col, stone, direction)
-            score += pattern_score
+        for code in patterns.encode_windows(self.board, row, col, patterns.SHAPE_RADIUS):
+            score += self._shape_scores[patterns.SHAPES[stone][code]]
         
         return score
     
     def _evaluate_direction(self, row: int, col: int, stone: Stone, 
                            direction: Tuple[int, int]) -> int:
         """Evaluate a pattern in a specific direction."""
-        dr, dc = direction
-        
-        # Count consecutive stones
-        count = self.board.count_consecutive(row, col, stone, direction)
-        
-        if count >= 5:
-            return self.FIVE
-        
-        # Check if the pattern is open (both ends are empty)
-        is_open = self._is_pattern_open(row, col, stone, direction)
-        
-        # Score based on count and openness
-        if count == 4:
-            return self.OPEN_FOUR if is_open else self.FOUR
-        elif count == 3:
-            return self.OPEN_THREE if is_open else self.THREE
-        elif count == 2:
-            return self.OPEN_TWO if is_open else self.TWO
-        
-        return 0
-    
-    def _is_pattern_open(self, row: int, col: int, stone: Stone, 
-                        direction: Tuple[int, int]) -> bool:
-        """Check if a pattern has both ends open."""
-        dr, dc = direction
-        
-        # Find the extent of the pattern
-        # Positive direction
-        r, c = row, col
-        while self.board.is_valid_position(r, c) and self.board.grid[r, c] == stone:
-            r += dr
-            c += dc
-        
-        # Check if positive end is open
-        positive_open = self.board.is_valid_position(r, c) and self.board.grid[r, c] == Stone.EMPTY
-        
-        # Negative direction
-        r, c = row, col
-        while self.board.is_valid_position(r, c) and self.board.grid[r, c] == stone:
-            r -= dr
-            c -= dc
-        
-        # Check if negative end is open
-        negative_open = self.board.is_valid_position(r, c) and self.board.grid[r, c] == Stone.EMPTY
-        
-        return positive_open and negative_open
+        code = patterns.encode_windows(self.board, row, col, patterns.SHAPE_RADIUS)[
+            Board.DIRECTIONS.index(direction)]
+        return self._shape_scores[patterns.SHAPES[stone][code]]
     
     def _positional_bonus(self, stone: Stone) -> int:
         """Give bonus for stones near the center."""
@@ -131,12 +264,15 @@ class PositionEvaluator:
         Calculate win probability for the given stone.
         Returns a value between 0.0 and 1.0.
         """
-        score = self.evaluate(perspective)
-        
+        return self.score_probability(self.evaluate(perspective))
+    
+    @classmethod
+    def score_probability(cls, score: float) -> float:
+        """Convert a score, static or from a search, to a win probability."""
         # Use sigmoid function to convert score to probability
         # sigmoid(x) = 1 / (1 + e^(-x))
         # Scale the score to make it more sensitive
-        scaled_score = score / 1000.0
+        scaled_score = score / cls.WIN_PROBABILITY_SCALE
         
         # Clamp to avoid overflow
         scaled_score = max(-10, min(10, scaled_score))
@@ -145,6 +281,92 @@ class PositionEvaluator:
         
         return probability
     
+    @classmethod
+    def evaluate_batch(cls, grids: np.ndarray, perspective: Stone = Stone.BLACK,
+                       with_probability: bool = False):
+        """
+        Evaluate many positions at once.
+        grids is an (N, 15, 15) array of stone values. Returns an int64 array
+        of N scores identical to evaluate() on the same (not finished) positions,
+        or (scores, win probabilities) if with_probability is set.
+        """
+        grids = np.asarray(grids, dtype=np.int8)
+        if grids.ndim != 3 or grids.shape[1:] != (Board.SIZE, Board.SIZE):
+            raise ValueError(f"expected an (N, {Board.SIZE}, {Board.SIZE}) array, got {grids.shape}")
+        
+        scores = np.empty(grids.shape[0], dtype=np.int64)
+        for start in range(0, grids.shape[0], cls.BATCH_CHUNK):
+            chunk = grids[start:start + cls.BATCH_CHUNK]
+            scores[start:start + chunk.shape[0]] = cls._evaluate_chunk(chunk, perspective)
+        
+        if not with_probability:
+            return scores
+        
+        scaled = np.clip(scores / cls.WIN_PROBABILITY_SCALE, -10, 10)
+        return scores, 1.0 / (1.0 + np.exp(-scaled))
+    
+    @classmethod
+    def _evaluate_chunk(cls, grids: np.ndarray, perspective: Stone) -> np.ndarray:
+        """Vectorized evaluate() over a block of positions."""
+        size = Board.SIZE
+        pad = 5
+        padded = np.pad(grids, ((0, 0), (pad, pad), (pad, pad)),
+                        constant_values=patterns.EDGE)
+        empty = padded == Stone.EMPTY
+        
+        # Score of a stone by the length of its run (capped at 5) and openness
+        run_scores = np.zeros((6, 2), dtype=np.int64)
+        run_scores[2] = (cls.TWO, cls.OPEN_TWO)
+        run_scores[3] = (cls.THREE, cls.OPEN_THREE)
+        run_scores[4] = (cls.FOUR, cls.OPEN_FOUR)
+        run_scores[5] = (cls.FIVE, cls.FIVE)
+        
+        def shifted(cells: np.ndarray, dr: int, dc: int, steps: int) -> np.ndarray:
+            """View of cells aligned so [n, row, col] holds the cell steps along (dr, dc)."""
+            r0 = pad + steps * dr
+            c0 = pad + steps * dc
+            return cells[:, r0:r0 + size, c0:c0 + size]
+        
+        totals = {}
+        for stone in (Stone.BLACK, Stone.WHITE):
+            own = padded == stone
+            total = np.zeros(grids.shape[0], dtype=np.int64)
+            
+            for dr, dc in Board.DIRECTIONS:
+                runs = []
+                open_ends = []
+                for sign in (1, -1):
+                    # Length of the run beyond the stone on this side (4 is enough to spot a five)
+                    length = np.zeros(grids.shape, dtype=np.int8)
+                    alive = np.ones(grids.shape, dtype=bool)
+                    for step in range(1, 5):
+                        alive &= shifted(own, dr, dc, sign * step)
+                        length += alive
+                    
+                    # The cell just past the run must be an empty board cell
+                    end_open = np.zeros(grids.shape, dtype=bool)
+                    for step in range(1, 6):
+                        end_open |= (length == step - 1) & shifted(empty, dr, dc, sign * step)
+                    
+                    runs.append(length)
+                    open_ends.append(end_open)
+                
+                count = np.minimum(1 + runs[0].astype(np.int64) + runs[1], 5)
+                is_open = (open_ends[0] & open_ends[1]).astype(np.int64)
+                stone_scores = run_scores[count, is_open]
+                total += np.where(grids == stone, stone_scores, 0).sum(axis=(1, 2))
+            
+            totals[stone] = total
+        
+        # Positional bonus (center is better)
+        center = size // 2
+        rows, cols = np.indices((size, size))
+        bonus = np.maximum(0, 10 - np.abs(rows - center) - np.abs(cols - center))
+        positional = np.where(grids == perspective, bonus, 0).sum(axis=(1, 2))
+        
+        opponent = Stone.WHITE if perspective == Stone.BLACK else Stone.BLACK
+        return totals[perspective] - totals[opponent] + positional
+    
     def get_best_moves(self, stone: Stone, top_n: int = 5) -> list:
         """
         Get the top N best moves for the given stone.
@@ -152,15 +374,18 @@ class PositionEvaluator:
         """
         moves = []
         
-        for row in range(Board.SIZE):
-            for col in range(Board.SIZE):
-                if self.board.is_empty(row, col):
-                    # Simulate the move
-                    self.board.grid[row, col] = stone
-                    score = self.evaluate(stone)
-                    self.board.grid[row, col] = Stone.EMPTY
-                    
-                    moves.append((row, col, score))
+        if self.incremental:
+            base = self.evaluate(stone)
+            for row, col in self.board.get_empty_positions():
+                moves.append((row, col, base + self.move_delta(row, col, stone)))
+        else:
+            for row, col in self.board.get_empty_positions():
+                # Simulate the move
+                self.board.make_move(row, col, stone)
+                score = self.evaluate(stone)
+                self.board.unmake_move(row, col)
+                
+                moves.append((row, col, score))
         
         # Sort by score (descending)
         moves.sort(key=lambda x: x[2], reverse=True)
@@ -1,131 +1,746 @@
 """
-Minimax AI algorithm with Alpha-Beta pruning.
+Minimax AI algorithm with Alpha-Beta pruning, in negamax form with
+principal variation search and aspiration windows.
 """
 
-from typing import Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 from .board import Board, Stone
 from .evaluator import PositionEvaluator
 from .rule_engine import RenjuRuleEngine
+from .transposition import TranspositionTable
+from .vcf import VCFSolver
+from .vct import VCTSolver
+from .opening_book import OpeningBook
+from .analysis_store import AnalysisStore
+from .pns import ProofNumberSearch
+import threading
 import time
 
 
+class SearchStats:
+    """Statistics of one get_best_move call."""
+    
+    def __init__(self):
+        self.move: Optional[Tuple[int, int, int]] = None
+        self.source = 'search'          # 'book', 'store', 'solver' or 'search'
+        self.depth = 0                  # Deepest completed iteration
+        self.pv: List[Tuple[int, int]] = []
+        self.elapsed = 0.0
+        self.nodes = 0
+        self.nodes_per_depth: List[int] = []
+        self.leaf_evals_per_depth: List[int] = []
+        self.time_to_depth: List[float] = []
+        self.interior_nodes = 0         # Nodes that generated moves
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.cutoffs_by_source: Dict[str, int] = {}
+        self.re_searches = 0
+        self.aspiration_failures = 0
+        self.eval_time = 0.0            # Seconds in static evaluation
+        self.movegen_time = 0.0         # Seconds generating candidate moves
+        self.forbidden_time = 0.0       # Seconds in forbidden-move checks
+        self.tt_probes = 0
+        self.tt_hits = 0
+    
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+    
+    @property
+    def cutoff_rate(self) -> float:
+        """Fraction of interior nodes that ended in a beta cutoff."""
+        return self.cutoffs / self.interior_nodes if self.interior_nodes else 0.0
+    
+    @property
+    def first_move_cutoff_ratio(self) -> float:
+        """Fraction of cutoffs caused by the first move searched."""
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+    
+    @property
+    def tt_hit_rate(self) -> float:
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+    
+    def to_dict(self) -> Dict[str, object]:
+        """JSON-friendly copy, including the derived rates."""
+        data = dict(vars(self))
+        for name in ('nodes_per_second', 'cutoff_rate', 'first_move_cutoff_ratio', 'tt_hit_rate'):
+            data[name] = getattr(self, name)
+        return data
+    
+    def summary(self) -> str:
+        """One-line description for status displays."""
+        if self.source != 'search':
+            return f"{self.source} move, depth {self.depth}"
+        return (f"depth {self.depth}, {self.nodes:,} nodes in {self.elapsed:.2f}s "
+                f"({self.nodes_per_second:,.0f}/s), cutoffs {self.cutoff_rate:.0%} "
+                f"({self.first_move_cutoff_ratio:.0%} first move), TT hits {self.tt_hit_rate:.0%}")
+    
+    def __repr__(self) -> str:
+        return f"SearchStats({self.summary()}, pv={self.pv})"
+
+
 class MinimaxAI:
     """AI player using Minimax algorithm with Alpha-Beta pruning."""
     
-    def __init__(self, board: Board, max_depth: int = 3, time_limit: float = 5.0):
+    # The clock is read once every TIME_CHECK_MASK + 1 nodes
+    TIME_CHECK_MASK = 31
+    
+    # Half-width of the root search window around the previous iteration's score
+    ASPIRATION_WINDOW = 400
+    
+    # Killer moves remembered per ply
+    KILLER_SLOTS = 2
+    MAX_PLY = 64
+    
+    # Additive per-search counters, merged from workers by the parallel search
+    STAT_COUNTERS = ('leaf_evals', 'interior_nodes', 'cutoffs', 'first_move_cutoffs',
+                     'research_count', 'eval_time', 'movegen_time', 'forbidden_time')
+    
+    def __init__(self, board: Board, max_depth: int = 3, time_limit: float = 5.0,
+                 use_vcf: bool = True, use_vct: bool = True,
+                 book: Optional[OpeningBook] = None,
+                 store: Optional[AnalysisStore] = None):
         self.board = board
+        self.book = book
+        self.store = store
         self.max_depth = max_depth
         self.time_limit = time_limit
-        self.evaluator = PositionEvaluator(board)
+        self.evaluator = PositionEvaluator(board, incremental=True)
         self.rule_engine = RenjuRuleEngine(board)
+        self.use_vcf = use_vcf
+        self.use_vct = use_vct
+        self.vcf = VCFSolver(board, self.rule_engine, time_limit=min(1.0, time_limit / 5))
+        self.vct = VCTSolver(board, self.rule_engine, time_limit=min(1.0, time_limit / 5))
+        self.vcf.interrupt = self.vct.interrupt = self._solver_interrupted
+        self.tt = TranspositionTable()
+        self.tt_perspective: Optional[Stone] = None
         self.nodes_evaluated = 0
         self.start_time = 0
+        self.deadline = 0
+        self.timed_out = False
+        self.completed_depth = 0
+        self.root_depth = 0
+        
+        # Pondering and stopping are driven from another thread, so the
+        # clock is only changed under this lock
+        self._clock_lock = threading.Lock()
+        self.pondering = False
+        self.stop_requested = False
+        self.searching = False
+        
+        # Optional object whose cancelled attribute, once true, stops the search
+        self.cancel_token = None
+        
+        # Move ordering state, kept across the iterations of a search
+        self.killers: List[List[Optional[Tuple[int, int]]]] = [
+            [None] * self.KILLER_SLOTS for _ in range(self.MAX_PLY)]
+        self.history = [[0] * (Board.SIZE * Board.SIZE) for _ in range(3)]  # [stone][cell]
+        
+        # Cutoff statistics of the last search
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.cutoffs_by_source: Dict[str, int] = {'tt': 0, 'killer': 0, 'static': 0, 'history': 0}
+        self.research_count = 0
+        self.aspiration_failures = 0
+        self.iteration_nodes: List[int] = []  # Nodes spent on each completed depth
+        self.iteration_times: List[float] = []  # Seconds from the start to each completed depth
+        
+        # Work counters of the last search; the timers only run when
+        # collect_timings is set, as they cost more than what they measure
+        self.collect_timings = False
+        self.source = 'search'
+        self.leaf_evals = 0
+        self.interior_nodes = 0
+        self.eval_time = 0.0
+        self.movegen_time = 0.0
+        self.forbidden_time = 0.0
+        self.iteration_leaf_evals: List[int] = []
+        self._tt_probes_start = 0
+        self._tt_hits_start = 0
     
-    def get_best_move(self, stone: Stone) -> Optional[Tuple[int, int, int]]:
+    def get_best_move(self, stone: Stone, with_stats: bool = False):
         """
         Get the best move for the given stone.
-        Returns (row, col, score) or None if no valid moves.
+        Searches with iterative deepening until max_depth is reached or the
+        time limit runs out, and returns the best move of the deepest
+        iteration that produced one. With an analysis store, a stored
+        result at least max_depth deep is returned as is, and a shallower
+        one lets the search start past its depth.
+        While pondering is set the search has no deadline until ponderhit()
+        or stop() is called. Both flags are cleared when the search returns.
+        Returns (row, col, score) or None if no valid moves; with with_stats,
+        returns (move, SearchStats) and also times evaluation, move
+        generation and forbidden checks.
+        """
+        self.collect_timings = with_stats
+        try:
+            move = self._find_best_move(stone)
+        finally:
+            with self._clock_lock:
+                self.searching = False
+                self.pondering = False
+                self.stop_requested = False
+        
+        if not with_stats:
+            return move
+        return move, self.search_stats(move, stone)
+    
+    def search_stats(self, move: Optional[Tuple[int, int, int]], stone: Stone) -> SearchStats:
+        """Statistics of the last search, which returned move for stone."""
+        stats = SearchStats()
+        stats.move = move
+        stats.source = self.source
+        stats.depth = self.completed_depth
+        stats.elapsed = time.time() - self.start_time
+        stats.nodes = self.nodes_evaluated
+        stats.nodes_per_depth = list(self.iteration_nodes)
+        stats.leaf_evals_per_depth = list(self.iteration_leaf_evals)
+        stats.time_to_depth = list(self.iteration_times)
+        stats.interior_nodes = self.interior_nodes
+        stats.cutoffs = self.cutoffs
+        stats.first_move_cutoffs = self.first_move_cutoffs
+        stats.cutoffs_by_source = dict(self.cutoffs_by_source)
+        stats.re_searches = self.research_count
+        stats.aspiration_failures = self.aspiration_failures
+        stats.eval_time = self.eval_time
+        stats.movegen_time = self.movegen_time
+        stats.forbidden_time = self.forbidden_time
+        stats.tt_probes = self.tt.probes - self._tt_probes_start
+        stats.tt_hits = self.tt.hits - self._tt_hits_start
+        if move is not None:
+            stats.pv = self.principal_variation(move[0], move[1], stone, max(1, self.completed_depth))
+        return stats
+    
+    def ponderhit(self):
+        """
+        The pondered position was reached: give the search the normal time
+        limit, counted from when pondering started.
         """
+        with self._clock_lock:
+            self.pondering = False
+            if not self.stop_requested:
+                self._set_deadline(self.start_time + self.time_limit)
+    
+    def stop(self):
+        """
+        Stop the running search. A pondering search that has not started
+        yet stops as soon as it starts; otherwise an idle engine ignores it.
+        """
+        with self._clock_lock:
+            if self.searching or self.pondering:
+                self.pondering = False
+                self.stop_requested = True
+                self._set_deadline(0)
+    
+    def solve_threats(self, stone: Stone) -> Optional[List[Tuple[int, int]]]:
+        """
+        Look for a forced win (VCT) for stone, who is to move, outside of a
+        move search. The solver's own time limit applies, and stop() or the
+        cancel token end it early. A proven win is saved in the analysis store.
+        """
+        with self._clock_lock:
+            self.start_time = time.time()
+            self.searching = True
+            self._set_deadline(0 if self.stop_requested else self.start_time + self.vct.time_limit)
+        self.timed_out = False
+        try:
+            line = self.vct.solve(stone)
+        finally:
+            with self._clock_lock:
+                self.searching = False
+                self.stop_requested = False
+        
+        if line and self.store is not None:
+            self.store.record(self.board, stone, 0, PositionEvaluator.FIVE, line[0], ProofNumberSearch.WIN)
+        return line
+    
+    def detach(self):
+        """Stop the evaluator and rule engine following the board, once the AI is no longer used."""
+        self.evaluator.detach()
+        self.rule_engine.detach()
+    
+    def _solver_interrupted(self) -> bool:
+        """Clock check handed to the threat solvers, so they keep the search's deadline."""
+        self._check_time()
+        return self.timed_out
+    
+    def _set_deadline(self, deadline: float):
+        """Move the search deadline."""
+        self.deadline = deadline
+    
+    def _find_best_move(self, stone: Stone) -> Optional[Tuple[int, int, int]]:
+        """Body of get_best_move."""
         self.nodes_evaluated = 0
-        self.start_time = time.time()
+        with self._clock_lock:
+            self.start_time = time.time()
+            self.searching = True
+            if self.stop_requested:
+                self._set_deadline(0)
+            elif self.pondering:
+                self._set_deadline(float('inf'))
+            else:
+                self._set_deadline(self.start_time + self.time_limit)
+        self.timed_out = False
+        self.completed_depth = 0
+        self._new_ordering_search()
+        self._reset_counters()
         
-        best_move = None
-        best_score = float('-inf')
-        alpha = float('-inf')
-        beta = float('inf')
+        # Stored scores are relative to the searching side
+        if self.tt_perspective != stone:
+            self.tt.clear()
+            self.tt_perspective = stone
+        self.tt.new_search()
+        
+        # Book positions are answered without searching
+        if self.book is not None:
+            move = self.book.pick_move(self.board, stone, self.rule_engine)
+            if move is not None:
+                self.source = 'book'
+                return move
+        
+        stored = self._stored_analysis(stone)
+        if stored is not None and (stored.solver == ProofNumberSearch.WIN
+                                   or stored.depth >= self.max_depth):
+            self.completed_depth = stored.depth
+            self.source = 'store'
+            return (stored.move[0], stored.move[1], stored.score)
+        
+        # A proven forced win needs no full-width search
+        # (the VCT search tries a plain VCF first)
+        line = None
+        if self.use_vct:
+            line = self.vct.solve(stone)
+        elif self.use_vcf:
+            line = self.vcf.solve(stone)
+        if line:
+            row, col = line[0]
+            if self.store is not None:
+                self.store.record(self.board, stone, 0, PositionEvaluator.FIVE,
+                                  (row, col), ProofNumberSearch.WIN)
+            self.source = 'solver'
+            return (row, col, PositionEvaluator.FIVE)
         
         # Get candidate moves (prioritize center and nearby stones)
         candidates = self._get_candidate_moves(stone)
         
+        # Skip forbidden moves for black
+        if stone == Stone.BLACK:
+            candidates = [(row, col) for row, col in candidates
+                          if not self.rule_engine.is_forbidden_move(row, col, stone)]
+        
         if not candidates:
             return None
         
-        for row, col in candidates:
-            # Check time limit
-            if time.time() - self.start_time > self.time_limit:
+        entry = self.tt.probe(self.board.zobrist_key)
+        if entry is not None:
+            candidates = self._order_tt_move(candidates, entry[3])
+        
+        # A stored shallower search stands in for the first iterations
+        best_move = None
+        first_depth = 1
+        if stored is not None and stored.depth > 0 and stored.move in candidates:
+            best_move = (stored.move[0], stored.move[1], stored.score)
+            self.completed_depth = stored.depth
+            first_depth = stored.depth + 1
+            candidates = self._order_tt_move(candidates, stored.move)
+        
+        scores = []
+        for depth in range(first_depth, self.max_depth + 1):
+            nodes_before = self.nodes_evaluated
+            leaf_evals_before = self.leaf_evals
+            result = self._search_root_aspirated(stone, candidates, depth, scores)
+            
+            # Keep the previous iteration's move if nothing finished in time
+            if result is not None:
+                best_move = result
+            if self.timed_out:
                 break
+            self.completed_depth = depth
+            self.iteration_nodes.append(self.nodes_evaluated - nodes_before)
+            self.iteration_leaf_evals.append(self.leaf_evals - leaf_evals_before)
+            self.iteration_times.append(time.time() - self.start_time)
+            scores.append(best_move[2])
             
-            # Skip forbidden moves for black
-            if stone == Stone.BLACK and self.rule_engine.is_forbidden_move(row, col, stone):
-                continue
+            # Search the principal variation first in the next iteration
+            candidates.remove(best_move[:2])
+            candidates.insert(0, best_move[:2])
             
-            # Make the move
-            self.board.grid[row, col] = stone
+            # No point searching deeper once a five is forced either way
+            if abs(best_move[2]) >= PositionEvaluator.FIVE:
+                break
+        
+        # Out of time before the first iteration finished: the move ordering's
+        # favourite, scored statically, still beats passing
+        if best_move is None:
+            row, col = candidates[0]
+            self.board.make_move(row, col, stone)
+            best_move = (row, col, self.evaluator.evaluate(stone))
+            self.board.unmake_move(row, col)
+        
+        if self.store is not None and self.completed_depth >= first_depth:
+            self.store.record(self.board, stone, self.completed_depth, best_move[2], best_move[:2])
+        
+        return best_move
+    
+    def principal_variation(self, row: int, col: int, stone: Stone,
+                            max_length: int) -> List[Tuple[int, int]]:
+        """
+        The line the last search expected after stone plays (row, col),
+        following the transposition table's best moves. Starts with (row, col).
+        """
+        line = [(row, col)]
+        mover = stone
+        self.board.make_move(row, col, mover)
+        while len(line) < max_length:
+            entry = self.tt.probe(self.board.zobrist_key)
+            if entry is None or entry[3] is None or not self.board.is_empty(*entry[3]):
+                break
+            mover = self._opponent(mover)
+            line.append(entry[3])
+            self.board.make_move(entry[3][0], entry[3][1], mover)
+        for move_row, move_col in reversed(line):
+            self.board.unmake_move(move_row, move_col)
+        return line
+    
+    def predicted_reply(self, row: int, col: int, stone: Stone) -> Optional[Tuple[int, int]]:
+        """
+        The opponent's reply the last search expected after stone plays
+        (row, col), taken from the transposition table. None if unknown.
+        """
+        line = self.principal_variation(row, col, stone, 2)
+        return line[1] if len(line) > 1 else None
+    
+    def _stored_analysis(self, stone: Stone):
+        """The store's entry for the current position if its move is still playable."""
+        if self.store is None:
+            return None
+        entry = self.store.lookup(self.board, stone)
+        if entry is None or entry.move is None or not self.board.is_empty(*entry.move):
+            return None
+        return entry
+    
+    def _search_root_aspirated(self, stone: Stone, candidates: list, depth: int,
+                               scores: List[int]) -> Optional[Tuple[int, int, int]]:
+        """
+        Search the root in a window around the score of the last iteration
+        of the same parity (the side that moves last alternates with depth,
+        so neighbouring iterations disagree). A score outside the window
+        doubles it on that side until the score lands inside.
+        """
+        if len(scores) < 2 or abs(scores[-2]) >= PositionEvaluator.FIVE:
+            return self._search_root(stone, candidates, depth)
+        
+        center = scores[-2]
+        below = above = self.ASPIRATION_WINDOW
+        while True:
+            alpha = center - below if below < PositionEvaluator.FIVE else float('-inf')
+            beta = center + above if above < PositionEvaluator.FIVE else float('inf')
+            result = self._search_root(stone, candidates, depth, alpha, beta)
+            if self.timed_out or result is None or alpha < result[2] < beta:
+                return result
+            
+            self.aspiration_failures += 1
+            if result[2] <= alpha:
+                below *= 4
+            else:
+                above *= 4
+    
+    def _search_root(self, stone: Stone, candidates: list, depth: int,
+                     alpha: float = float('-inf'),
+                     beta: float = float('inf')) -> Optional[Tuple[int, int, int]]:
+        """
+        Search every root candidate to the given depth within (alpha, beta).
+        The first move gets the full window and the rest a zero window,
+        re-searched only when they beat it.
+        If time runs out part way, the best fully searched move is returned.
+        Because the previous best move is searched first, any move that
+        finished and beat it is a safe choice. Returns None if no move
+        finished, or if nothing scored above alpha before time ran out.
+        """
+        best_move = None
+        best_score = float('-inf')
+        alpha_orig = alpha
+        opponent = self._opponent(stone)
+        self.root_depth = depth
+        
+        for row, col in candidates:
+            self._check_time()
+            if self.timed_out:
+                break
             
-            # Evaluate with minimax
-            score = self._minimax(self.max_depth - 1, alpha, beta, False, stone)
+            self.board.make_move(row, col, stone)
+            score = self._pvs_child(depth - 1, alpha, beta, opponent, stone, best_move is None)
+            self.board.unmake_move(row, col)
             
-            # Undo the move
-            self.board.grid[row, col] = Stone.EMPTY
+            if self.timed_out:
+                break
             
             if score > best_score:
                 best_score = score
                 best_move = (row, col, score)
             
             alpha = max(alpha, score)
+            if alpha >= beta:
+                break  # Fail high: the caller widens the window
+        
+        if self.timed_out and best_score <= alpha_orig:
+            return None
+        
+        if best_move is not None and not self.timed_out and alpha_orig < best_score < beta:
+            self.tt.store(self.board.zobrist_key, depth,
+                          TranspositionTable.EXACT, best_score, best_move[:2])
         
         return best_move
     
-    def _minimax(self, depth: int, alpha: float, beta: float, 
-                 is_maximizing: bool, perspective: Stone) -> float:
+    def _pvs_child(self, depth: int, alpha: float, beta: float, stone: Stone,
+                   perspective: Stone, first: bool) -> float:
         """
-        Minimax algorithm with Alpha-Beta pruning.
+        Score of the move just made, from the mover's side. Moves after the
+        first are tried with a zero window and re-searched with the full
+        window only if they land inside it.
+        """
+        if first or alpha == float('-inf'):
+            return -self._negamax(depth, -beta, -alpha, stone, perspective)
+        
+        score = -self._negamax(depth, -alpha - 1, -alpha, stone, perspective)
+        if alpha < score < beta and not self.timed_out:
+            self.research_count += 1
+            score = -self._negamax(depth, -beta, -alpha, stone, perspective)
+        return score
+    
+    def _check_time(self):
+        """Flag the search as timed out once the deadline has passed or it is cancelled."""
+        if time.time() > self.deadline or (self.cancel_token is not None and self.cancel_token.cancelled):
+            self.timed_out = True
+    
+    def _negamax(self, depth: int, alpha: float, beta: float,
+                 stone: Stone, perspective: Stone) -> float:
+        """
+        Negamax alpha-beta search with principal variation search.
+        Scores are from the side to move (stone); the evaluation is always
+        taken from the root side (perspective) and negated for the opponent.
         """
         self.nodes_evaluated += 1
         
-        # Check time limit
-        if time.time() - self.start_time > self.time_limit:
-            return self.evaluator.evaluate(perspective)
+        # Check the clock only every few nodes to keep the overhead down
+        if self.nodes_evaluated & self.TIME_CHECK_MASK == 0:
+            self._check_time()
+        if self.timed_out:
+            return 0
         
         # Terminal conditions
         if depth == 0 or self.board.game_over:
-            return self.evaluator.evaluate(perspective)
+            return self._leaf_score(stone, perspective)
         
-        current_stone = perspective if is_maximizing else (
-            Stone.WHITE if perspective == Stone.BLACK else Stone.BLACK
-        )
+        # Transposition table lookup
+        key = self.board.zobrist_key
+        alpha_orig, beta_orig = alpha, beta
+        tt_move = None
+        entry = self.tt.probe(key)
+        if entry is not None:
+            tt_depth, bound, tt_score, tt_move = entry
+            if tt_depth >= depth:
+                if bound == TranspositionTable.EXACT:
+                    return tt_score
+                elif bound == TranspositionTable.LOWER_BOUND:
+                    alpha = max(alpha, tt_score)
+                else:
+                    beta = min(beta, tt_score)
+                if beta <= alpha:
+                    return tt_score
         
-        candidates = self._get_candidate_moves(current_stone, limit=15)
+        opponent = self._opponent(stone)
         
-        if not candidates:
-            return self.evaluator.evaluate(perspective)
+        # Moves are generated lazily, so a cutoff by the TT move or a killer
+        # skips building the full candidate list
+        ply = self.root_depth - depth
+        candidates = self._ordered_moves(stone, tt_move, ply)
+        best_eval = float('-inf')
+        best_move = None
+        searched = 0
         
-        if is_maximizing:
-            max_eval = float('-inf')
-            for row, col in candidates:
-                # Skip forbidden moves
-                if current_stone == Stone.BLACK and self.rule_engine.is_forbidden_move(row, col, current_stone):
+        self.interior_nodes += 1
+        
+        for (row, col), source in candidates:
+            # Skip forbidden moves
+            if stone == Stone.BLACK:
+                if self.collect_timings:
+                    started = time.perf_counter()
+                    forbidden = self.rule_engine.is_forbidden_move(row, col, stone)
+                    self.forbidden_time += time.perf_counter() - started
+                else:
+                    forbidden = self.rule_engine.is_forbidden_move(row, col, stone)
+                if forbidden:
                     continue
-                
-                self.board.grid[row, col] = current_stone
-                eval_score = self._minimax(depth - 1, alpha, beta, False, perspective)
-                self.board.grid[row, col] = Stone.EMPTY
-                
-                max_eval = max(max_eval, eval_score)
-                alpha = max(alpha, eval_score)
-                
-                if beta <= alpha:
-                    break  # Beta cutoff
             
-            return max_eval
-        else:
-            min_eval = float('inf')
-            for row, col in candidates:
-                # Skip forbidden moves
-                if current_stone == Stone.BLACK and self.rule_engine.is_forbidden_move(row, col, current_stone):
-                    continue
-                
-                self.board.grid[row, col] = current_stone
-                eval_score = self._minimax(depth - 1, alpha, beta, True, perspective)
-                self.board.grid[row, col] = Stone.EMPTY
-                
-                min_eval = min(min_eval, eval_score)
-                beta = min(beta, eval_score)
-                
-                if beta <= alpha:
-                    break  # Alpha cutoff
+            self.board.make_move(row, col, stone)
+            eval_score = self._pvs_child(depth - 1, alpha, beta, opponent, perspective, searched == 0)
+            self.board.unmake_move(row, col)
+            if self.timed_out:
+                return 0
+            searched += 1
+            
+            if eval_score > best_eval:
+                best_eval = eval_score
+                best_move = (row, col)
+            alpha = max(alpha, eval_score)
             
-            return min_eval
+            if beta <= alpha:
+                self._record_cutoff((row, col), stone, depth, ply, source, searched)
+                break  # Cutoff
+        
+        # No moves, or every candidate was forbidden for black: score the
+        # position statically rather than storing and returning -inf
+        if not searched:
+            return self._leaf_score(stone, perspective)
+        
+        if best_eval <= alpha_orig:
+            bound = TranspositionTable.UPPER_BOUND
+        elif best_eval >= beta_orig:
+            bound = TranspositionTable.LOWER_BOUND
+        else:
+            bound = TranspositionTable.EXACT
+        self.tt.store(key, depth, bound, best_eval, best_move)
+        
+        return best_eval
+    
+    def _leaf_score(self, stone: Stone, perspective: Stone) -> float:
+        """Static evaluation from the side to move."""
+        self.leaf_evals += 1
+        if self.collect_timings:
+            started = time.perf_counter()
+            score = self.evaluator.evaluate(perspective)
+            self.eval_time += time.perf_counter() - started
+        else:
+            score = self.evaluator.evaluate(perspective)
+        return score if stone == perspective else -score
+    
+    def _opponent(self, stone: Stone) -> Stone:
+        """Return the other colour."""
+        return Stone.WHITE if stone == Stone.BLACK else Stone.BLACK
+    
+    def _new_ordering_search(self):
+        """Age the history table and clear the killers and cutoff statistics."""
+        for table in self.history:
+            for index, value in enumerate(table):
+                table[index] = value >> 1
+        for slots in self.killers:
+            slots[:] = [None] * self.KILLER_SLOTS
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.cutoffs_by_source = {'tt': 0, 'killer': 0, 'static': 0, 'history': 0}
+        self.research_count = 0
+        self.aspiration_failures = 0
+    
+    def _ordered_moves(self, stone: Stone, tt_move: Optional[Tuple[int, int]], ply: int):
+        """
+        Yield (move, source) in search order: the TT move, this ply's killer
+        moves, the best move by the static ordering, then the remaining
+        candidates by history score. The candidate list is only built once
+        the TT move and killers are used up. source is 'history' for a move
+        its history score moved ahead of the static order, and 'static' for
+        the others from the candidate list.
+        """
+        tried = []
+        if tt_move is not None and self.board.is_empty(*tt_move):
+            tried.append(tt_move)
+            yield tt_move, 'tt'
+        
+        if ply < self.MAX_PLY:
+            for killer in self.killers[ply]:
+                if (killer is not None and killer not in tried and self.board.is_empty(*killer)
+                        and self.board.has_nearby_stone(*killer)):
+                    tried.append(killer)
+                    yield killer, 'killer'
+        
+        if self.collect_timings:
+            started = time.perf_counter()
+            rest = [move for move in self._get_candidate_moves(stone, limit=15) if move not in tried]
+            self.movegen_time += time.perf_counter() - started
+        else:
+            rest = [move for move in self._get_candidate_moves(stone, limit=15) if move not in tried]
+        if not rest:
+            return
+        yield rest[0], 'static'
+        
+        # The sort is stable, so only moves with a history score can move up
+        history = self.history[stone]
+        scores = [history[row * Board.SIZE + col] for row, col in rest[1:]]
+        ordered = sorted(range(len(scores)), key=lambda index: -scores[index])
+        for position, index in enumerate(ordered):
+            yield rest[index + 1], 'history' if position < index else 'static'
+    
+    def _reset_counters(self):
+        """Zero the work counters at the start of a search."""
+        self.source = 'search'
+        for name in self.STAT_COUNTERS:
+            setattr(self, name, 0)
+        self.iteration_nodes = []
+        self.iteration_times = []
+        self.iteration_leaf_evals = []
+        self._tt_probes_start = self.tt.probes
+        self._tt_hits_start = self.tt.hits
+    
+    def _counter_snapshot(self) -> Dict[str, float]:
+        """
+        Current values of the additive counters, TT probes and hits
+        included; cutoffs by source are under 'cutoffs.<source>'.
+        """
+        snapshot = {name: getattr(self, name) for name in self.STAT_COUNTERS}
+        snapshot['tt_probes'] = self.tt.probes
+        snapshot['tt_hits'] = self.tt.hits
+        for source, count in self.cutoffs_by_source.items():
+            snapshot['cutoffs.' + source] = count
+        return snapshot
+    
+    def _record_cutoff(self, move: Tuple[int, int], stone: Stone, depth: int, ply: int,
+                       source: str, searched: int):
+        """
+        Update the killers, history and statistics after a cutoff by a move
+        that _ordered_moves yielded from the given source.
+        """
+        self.cutoffs += 1
+        if searched == 1:
+            self.first_move_cutoffs += 1
+        
+        self.cutoffs_by_source[source] += 1
+        if source == 'tt':
+            return
+        
+        if ply < self.MAX_PLY:
+            slots = self.killers[ply]
+            if move not in slots:
+                slots.insert(0, move)
+                slots.pop()
+        
+        self.history[stone][move[0] * Board.SIZE + move[1]] += depth * depth
+    
+    def cutoff_stats(self) -> Dict[str, float]:
+        """
+        Cutoff statistics of the last search: cutoff count, how many came
+        from the first move searched, and which ordering source supplied it.
+        """
+        return {
+            'nodes': self.nodes_evaluated,
+            'cutoffs': self.cutoffs,
+            'first_move_rate': self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0,
+            'tt': self.cutoffs_by_source['tt'],
+            'killer': self.cutoffs_by_source['killer'],
+            'static': self.cutoffs_by_source['static'],
+            'history': self.cutoffs_by_source['history'],
+            're_searches': self.research_count,
+            'aspiration_failures': self.aspiration_failures,
+        }
+    
+    def _order_tt_move(self, candidates: list, tt_move: Optional[Tuple[int, int]]) -> list:
+        """Move the transposition table's best move to the front of the list."""
+        if tt_move is None:
+            return candidates
+        if tt_move in candidates:
+            candidates.remove(tt_move)
+        elif not self.board.is_empty(*tt_move):
+            return candidates
+        return [tt_move] + candidates
     
     def _get_candidate_moves(self, stone: Stone, limit: int = 25) -> list:
         """
@@ -134,34 +749,19 @@ class MinimaxAI:
         """
         candidates = []
         
-        # If board is empty, start at center
-        if len(self.board.move_history) == 0:
+        # If board is empty, start at center (search boards may have no move history)
+        if not (self.board.bitboards[Stone.BLACK] | self.board.bitboards[Stone.WHITE]):
             center = Board.SIZE // 2
             return [(center, center)]
         
-        # Get all empty positions near existing stones
-        for row in range(Board.SIZE):
-            for col in range(Board.SIZE):
-                if self.board.is_empty(row, col):
-                    # Check if there's a stone within 2 squares
-                    if self._has_nearby_stone(row, col, distance=2):
-                        # Quick evaluation
-                        self.board.grid[row, col] = stone
-                        score = self.evaluator.evaluate(stone)
-                        self.board.grid[row, col] = Stone.EMPTY
-                        
-                        candidates.append((row, col, score))
+        # Score each move by the pattern change on the four lines through it
+        base = self.evaluator.evaluate(stone)
+        
+        # Empty positions within 2 squares of a stone, maintained by the board
+        for row, col in self.board.get_candidate_positions():
+            score = base + self.evaluator.move_delta(row, col, stone)
+            candidates.append((row, col, score))
         
         # Sort by score and return top candidates
         candidates.sort(key=lambda x: x[2], reverse=True)
         return [(r, c) for r, c, _ in candidates[:limit]]
-    
-    def _has_nearby_stone(self, row: int, col: int, distance: int = 2) -> bool:
-        """Check if there's any stone within the given distance."""
-        for dr in range(-distance, distance + 1):
-            for dc in range(-distance, distance + 1):
-                r, c = row + dr, col + dc
-                if self.board.is_valid_position(r, c):
-                    if self.board.grid[r, c] != Stone.EMPTY:
-                        return True
-        return False
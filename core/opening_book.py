@@ -0,0 +1,164 @@
+"""
+Opening book stored as a sorted binary file and read through mmap.
+
+Positions are keyed by Board.canonical_key, the smallest Zobrist key
+among the eight rotations and reflections of the board, and moves are
+stored in that canonical orientation, so one entry covers every
+symmetric variant.
+
+File layout (little endian):
+    header: magic (8 bytes), version (uint32), record count (uint32)
+    records sorted by key: key (uint64), cell (uint16), weight (uint16), score (int32)
+A position with several book moves has one record per move.
+"""
+
+import mmap
+import os
+import random
+import struct
+from typing import Dict, List, Optional, Tuple
+from .board import Board, Stone
+
+
+MAGIC = b'OMKBOOK\0'
+VERSION = 1
+HEADER = struct.Struct('<8sII')
+RECORD = struct.Struct('<QHHi')
+
+
+class OpeningBook:
+    """Read-only opening book backed by a memory-mapped file."""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # An empty file cannot be mapped
+            self._file.close()
+            raise
+        
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path} is too short to be an opening book")
+        magic, version, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} opening book")
+        if HEADER.size + count * RECORD.size > len(self._map):
+            self.close()
+            raise ValueError(f"{path} is truncated")
+        self.count = count
+    
+    @classmethod
+    def open_default(cls) -> Optional['OpeningBook']:
+        """
+        Open the book named by OMOK_LAB_BOOK, or data/opening_book.bin next
+        to the package. Returns None if there is no usable book.
+        """
+        path = os.environ.get('OMOK_LAB_BOOK')
+        if not path:
+            root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            path = os.path.join(root, 'data', 'opening_book.bin')
+        try:
+            return cls(path)
+        except (OSError, ValueError, struct.error):
+            return None
+    
+    def close(self):
+        """Release the mapping and the file."""
+        self._map.close()
+        self._file.close()
+    
+    def _key_at(self, index: int) -> int:
+        """Key of the record at the given index."""
+        return struct.unpack_from('<Q', self._map, HEADER.size + index * RECORD.size)[0]
+    
+    def _records(self, key: int) -> List[Tuple[int, int, int]]:
+        """Binary-search the (cell, weight, score) records stored for a canonical key."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        
+        records = []
+        for index in range(low, self.count):
+            record_key, cell, weight, score = RECORD.unpack_from(
+                self._map, HEADER.size + index * RECORD.size)
+            if record_key != key:
+                break
+            records.append((cell, weight, score))
+        return records
+    
+    def lookup(self, board: Board) -> List[Tuple[int, int, int, int]]:
+        """
+        Get the book moves for the current position as (row, col, weight, score),
+        mapped back to the board's orientation. Empty if the position is not in the book.
+        """
+        key, symmetry = board.canonical_key()
+        moves = []
+        for cell, weight, score in self._records(key):
+            row, col = board.from_canonical(*divmod(cell, Board.SIZE), symmetry)
+            if board.is_empty(row, col):
+                moves.append((row, col, weight, score))
+        return moves
+    
+    def pick_move(self, board: Board, stone: Stone, rule_engine=None,
+                  rng: Optional[random.Random] = None) -> Optional[Tuple[int, int, int]]:
+        """
+        Choose a book move as (row, col, score), or None if out of book.
+        With an rng the choice is random in proportion to the weights,
+        otherwise the heaviest move is played. Forbidden moves are skipped
+        when a rule engine is given.
+        """
+        moves = self.lookup(board)
+        if rule_engine is not None and stone == Stone.BLACK:
+            moves = [move for move in moves
+                     if not rule_engine.is_forbidden_move(move[0], move[1], stone)]
+        moves = [move for move in moves if move[2] > 0]
+        if not moves:
+            return None
+        
+        if rng is None:
+            row, col, _, score = max(moves, key=lambda move: move[2])
+        else:
+            row, col, _, score = rng.choices(moves, weights=[move[2] for move in moves])[0]
+        return (row, col, score)
+
+
+class OpeningBookBuilder:
+    """Collects book moves and writes them in the OpeningBook file format."""
+    
+    def __init__(self):
+        # Canonical key -> canonical cell -> [weight, score]
+        self.entries: Dict[int, Dict[int, List[int]]] = {}
+    
+    def add(self, board: Board, row: int, col: int, weight: int = 1, score: int = 0):
+        """
+        Add a move for the current position. Adding the same move again
+        accumulates its weight and keeps the latest score.
+        """
+        key, symmetry = board.canonical_key()
+        canonical_row, canonical_col = board.to_canonical(row, col, symmetry)
+        cell = canonical_row * Board.SIZE + canonical_col
+        moves = self.entries.setdefault(key, {})
+        entry = moves.setdefault(cell, [0, 0])
+        entry[0] = min(0xFFFF, entry[0] + weight)
+        entry[1] = score
+    
+    def save(self, path: str):
+        """Write the book atomically, records sorted by key and cell."""
+        records = sorted((key, cell, weight, score)
+                         for key, moves in self.entries.items()
+                         for cell, (weight, score) in moves.items())
+        
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(records)))
+            for record in records:
+                f.write(RECORD.pack(*record))
+        os.replace(temp_path, path)
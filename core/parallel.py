@@ -0,0 +1,266 @@
+"""
+Root-parallel search for MinimaxAI.
+Root candidates are split across a pool of worker processes, each with its
+own board, evaluator and transposition table. Workers share the best root
+score found so far as their alpha bound, and read the deadline from shared
+memory so the parent can stop or extend a running search.
+Searches with the same number of workers share one pool; each
+ParallelMinimaxAI has its own slot in the shared alpha and deadline
+arrays, so searches running at the same time do not disturb each other.
+"""
+
+from typing import Dict, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, wait
+from .board import Board, Stone
+from .minimax import MinimaxAI
+from .opening_book import OpeningBook
+from .analysis_store import AnalysisStore
+from .transposition import TranspositionTable
+import atexit
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+import weakref
+
+
+# Shared alpha value meaning "no bound yet"
+NO_ALPHA = -(1 << 62)
+
+# ParallelMinimaxAI instances that can exist at once, one shared slot each
+SEARCH_SLOTS = 16
+
+# Worker process state, set up by _init_worker
+_worker_ai: Optional[MinimaxAI] = None
+_worker_alpha = None
+_worker_deadline = None
+
+# Pools shared by every ParallelMinimaxAI in this process, keyed by size
+_pools: Dict[int, Tuple[ProcessPoolExecutor, object, object]] = {}
+
+# Slots not held by a ParallelMinimaxAI
+_free_slots = list(range(SEARCH_SLOTS))
+_slots_lock = threading.Lock()
+
+# Numbers the root searches sent to the pools; a worker ages its table when it changes
+_root_searches = itertools.count(1)
+
+
+class _WorkerAI(MinimaxAI):
+    """Worker-side search that follows the parent's shared deadline."""
+    
+    # Root search this worker last searched a move for
+    root_search: Optional[int] = None
+    
+    # Shared slot of the search the current move belongs to
+    slot = 0
+    
+    def _check_time(self):
+        """Flag the search as timed out once the shared deadline has passed."""
+        if time.time() > _worker_deadline[self.slot]:
+            self.timed_out = True
+
+
+def _init_worker(shared_alpha, shared_deadline):
+    """Create the worker's own search objects once per process; the arrays hold one value per slot."""
+    global _worker_ai, _worker_alpha, _worker_deadline
+    _worker_ai = _WorkerAI(Board(), use_vcf=False, use_vct=False)
+    _worker_alpha = shared_alpha
+    _worker_deadline = shared_deadline
+
+
+def _search_move(encoded: Tuple[int, int], stone: Stone, move: Tuple[int, int], depth: int,
+                 slot: int, root_search: int,
+                 collect_timings: bool) -> Tuple[Tuple[int, int], Optional[int], bool, int, dict]:
+    """
+    Search one root move in a worker process.
+    Returns (move, score, exact, nodes, counters); score is None if time ran
+    out, exact is False when the move failed low against the shared alpha,
+    and counters holds the growth of the search statistics counters.
+    slot selects the parent's alpha and deadline in the shared arrays.
+    root_search numbers the parent's search; the worker's table is aged
+    once per root search, as the serial search ages its own.
+    """
+    # Tasks still queued when the deadline passes are skipped
+    ai = _worker_ai
+    if time.time() > _worker_deadline[slot]:
+        return move, None, False, 0, {}
+    ai.slot = slot
+    
+    board = ai.board
+    if board.encode() != encoded:
+        board.decode(encoded)
+        ai._new_ordering_search()
+    
+    if ai.tt_perspective != stone:
+        ai.tt.clear()
+        ai.tt_perspective = stone
+    if ai.root_search != root_search:
+        ai.tt.new_search()
+        ai.root_search = root_search
+    ai.nodes_evaluated = 0
+    ai.timed_out = False
+    ai.root_depth = depth
+    ai.collect_timings = collect_timings
+    before = ai._counter_snapshot()
+    
+    # Scores are integers, so a window opening just below the best score so
+    # far still gives exact scores for moves that tie it
+    shared = _worker_alpha[slot]
+    alpha = shared - 1 if shared != NO_ALPHA else float('-inf')
+    
+    row, col = move
+    board.make_move(row, col, stone)
+    score = -ai._negamax(depth - 1, float('-inf'), -alpha, ai._opponent(stone), stone)
+    board.unmake_move(row, col)
+    
+    after = ai._counter_snapshot()
+    counters = {name: after[name] - before[name] for name in after}
+    if ai.timed_out:
+        return move, None, False, ai.nodes_evaluated, counters
+    
+    exact = score > alpha
+    if exact:
+        with _worker_alpha.get_lock():
+            if score > _worker_alpha[slot]:
+                _worker_alpha[slot] = int(score)
+    
+    return move, score, exact, ai.nodes_evaluated, counters
+
+
+def get_pool(workers: int) -> Tuple[ProcessPoolExecutor, object, object]:
+    """
+    Return the shared worker pool of the given size with its alpha and
+    deadline arrays, one value per slot, starting it on first use. Workers
+    are spawned rather than forked so the pool is safe to start from a GUI
+    thread.
+    """
+    if workers not in _pools:
+        context = multiprocessing.get_context('spawn')
+        shared_alpha = context.Array('q', [NO_ALPHA] * SEARCH_SLOTS)
+        shared_deadline = context.Array('d', SEARCH_SLOTS)
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                   initargs=(shared_alpha, shared_deadline))
+        _pools[workers] = (pool, shared_alpha, shared_deadline)
+    return _pools[workers]
+
+
+def shutdown_pools():
+    """Stop every worker pool started by get_pool."""
+    for pool, _, _ in _pools.values():
+        pool.shutdown(cancel_futures=True)
+    _pools.clear()
+
+
+atexit.register(shutdown_pools)
+
+
+def _claim_slot() -> int:
+    """Take a free slot in the shared arrays."""
+    with _slots_lock:
+        if not _free_slots:
+            raise RuntimeError(f"at most {SEARCH_SLOTS} ParallelMinimaxAI instances can exist at once")
+        return _free_slots.pop()
+
+
+def _release_slot(slot: int):
+    """Return a slot once its ParallelMinimaxAI is gone."""
+    with _slots_lock:
+        _free_slots.append(slot)
+
+
+class ParallelMinimaxAI(MinimaxAI):
+    """MinimaxAI that searches the root moves of each iteration in parallel."""
+    
+    def __init__(self, board: Board, max_depth: int = 3, time_limit: float = 5.0,
+                 use_vcf: bool = True, use_vct: bool = True, book: Optional[OpeningBook] = None,
+                 store: Optional[AnalysisStore] = None, workers: Optional[int] = None):
+        """workers defaults to the number of CPUs."""
+        super().__init__(board, max_depth, time_limit, use_vcf, use_vct, book, store)
+        self.workers = workers or os.cpu_count() or 1
+        self.root_search = 0
+        
+        # This search's alpha and deadline in the pool's shared arrays
+        self.slot = _claim_slot()
+        weakref.finalize(self, _release_slot, self.slot)
+    
+    def _find_best_move(self, stone: Stone) -> Optional[Tuple[int, int, int]]:
+        """Number the search so the workers know when to age their tables."""
+        self.root_search = next(_root_searches)
+        return super()._find_best_move(stone)
+    
+    def _set_deadline(self, deadline: float):
+        """Move the deadline of this process and of the workers."""
+        self.deadline = deadline
+        _, _, shared_deadline = get_pool(self.workers)
+        shared_deadline[self.slot] = deadline
+    
+    def _add_counters(self, counters: dict):
+        """
+        Fold a worker's counters into this search's, cutoffs by source
+        included. Worker TT probes are credited to the local table's
+        counters so the hit rate covers them.
+        """
+        for name in self.STAT_COUNTERS:
+            setattr(self, name, getattr(self, name) + counters.get(name, 0))
+        for source in self.cutoffs_by_source:
+            self.cutoffs_by_source[source] += counters.get('cutoffs.' + source, 0)
+        self.tt.probes += counters.get('tt_probes', 0)
+        self.tt.hits += counters.get('tt_hits', 0)
+    
+    def _search_root_aspirated(self, stone: Stone, candidates: list, depth: int,
+                               scores: list) -> Optional[Tuple[int, int, int]]:
+        """Root moves run concurrently, so the shared alpha takes the place of aspiration."""
+        return self._search_root(stone, candidates, depth)
+    
+    def _search_root(self, stone: Stone, candidates: list,
+                     depth: int) -> Optional[Tuple[int, int, int]]:
+        """
+        Search every root candidate to the given depth in the worker pool.
+        The result does not depend on which worker finishes first: the best
+        exact score wins and ties go to the earlier candidate, as in the
+        serial search. If time runs out, the iteration only counts when the
+        previous best move (the first candidate) finished.
+        """
+        # Cancellation is only seen here; the workers follow the shared deadline
+        self._check_time()
+        if self.timed_out:
+            return None
+        
+        pool, shared_alpha, _ = get_pool(self.workers)
+        shared_alpha[self.slot] = NO_ALPHA
+        
+        encoded = self.board.encode()
+        futures = [pool.submit(_search_move, encoded, stone, move, depth, self.slot,
+                               self.root_search, self.collect_timings)
+                   for move in candidates]
+        wait(futures)
+        
+        results = {}
+        finished = set()
+        for future in futures:
+            move, score, exact, nodes, counters = future.result()
+            self.nodes_evaluated += nodes
+            self._add_counters(counters)
+            if score is None:
+                self.timed_out = True
+                continue
+            finished.add(move)
+            if exact:
+                results[move] = score
+        
+        if candidates[0] not in finished:
+            return None
+        
+        best_move = None
+        for row, col in candidates:
+            score = results.get((row, col))
+            if score is not None and (best_move is None or score > best_move[2]):
+                best_move = (row, col, score)
+        
+        if best_move is not None and not self.timed_out:
+            self.tt.store(self.board.zobrist_key, depth,
+                          TranspositionTable.EXACT, best_move[2], best_move[:2])
+        
+        return best_move
@@ -0,0 +1,245 @@
+"""
+Precomputed line-pattern tables shared by the evaluator and the rule engine.
+
+The cells around a stone along one direction are encoded as a base-4
+integer (0 = empty, 1 = black, 2 = white, 3 = off the board), which indexes
+tables of shape classes (for the evaluator) and Renju classifications (for
+the rule engine). The tables are built once with NumPy and cached on disk.
+"""
+
+import os
+from typing import List, Tuple
+import numpy as np
+from .board import Board, Stone
+
+
+# Window half-widths: rule checks look 5 cells each way (enough to tell an
+# exact five from an overline), shape scoring looks 4 cells each way.
+RULE_RADIUS = 5
+SHAPE_RADIUS = 4
+
+# Digit used for cells beyond the edge of the board
+EDGE = 3
+
+# Rule classification flags for a black stone at the window centre
+OPEN_THREE = 1
+OPEN_FOUR = 2
+FIVE = 4
+OVERLINE = 8
+
+# Shape classes for a stone at the window centre
+SHAPE_NONE = 0
+SHAPE_TWO = 1
+SHAPE_OPEN_TWO = 2
+SHAPE_THREE = 3
+SHAPE_OPEN_THREE = 4
+SHAPE_FOUR = 5
+SHAPE_OPEN_FOUR = 6
+SHAPE_FIVE = 7
+
+CACHE_VERSION = 1
+
+
+def _build_window_indices(radius: int) -> List[List[List[int]]]:
+    """
+    For every cell and direction, list the bitboard indices of the window
+    cells from offset -radius to +radius (centre excluded), or -1 off the board.
+    """
+    indices = []
+    for row in range(Board.SIZE):
+        for col in range(Board.SIZE):
+            per_direction = []
+            for dr, dc in Board.DIRECTIONS:
+                window = []
+                for offset in range(-radius, radius + 1):
+                    if offset == 0:
+                        continue
+                    r, c = row + offset * dr, col + offset * dc
+                    if Board.SIZE > r >= 0 and Board.SIZE > c >= 0:
+                        window.append(r * Board.STRIDE + c)
+                    else:
+                        window.append(-1)
+                per_direction.append(window)
+            indices.append(per_direction)
+    return indices
+
+
+_RULE_WINDOWS = _build_window_indices(RULE_RADIUS)
+_SHAPE_WINDOWS = _build_window_indices(SHAPE_RADIUS)
+
+
+def encode_windows(board: Board, row: int, col: int, radius: int) -> List[int]:
+    """
+    Encode the window around (row, col) in each of the four directions.
+    The centre cell itself is not part of the code.
+    """
+    windows = _RULE_WINDOWS if radius == RULE_RADIUS else _SHAPE_WINDOWS
+    black = board.bitboards[Stone.BLACK]
+    white = board.bitboards[Stone.WHITE]
+    
+    codes = []
+    for window in windows[row * Board.SIZE + col]:
+        code = 0
+        for index in window:
+            code <<= 2
+            if index < 0:
+                code |= EDGE
+            elif black >> index & 1:
+                code |= 1
+            elif white >> index & 1:
+                code |= 2
+        codes.append(code)
+    return codes
+
+
+def _decode_all(radius: int) -> np.ndarray:
+    """
+    Decode every window code into an (N, 2 * radius + 1) array of cell values,
+    with the centre column left at 0 for the caller to fill.
+    """
+    width = 2 * radius
+    codes = np.arange(4 ** width, dtype=np.int64)
+    cells = np.zeros((codes.size, width + 1), dtype=np.int8)
+    
+    for digit in range(width):
+        column = digit if digit < radius else digit + 1
+        cells[:, column] = (codes >> (2 * (width - 1 - digit))) & 3
+    
+    return cells
+
+
+def _run_lengths(own: np.ndarray, center: int, reach: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Length of the unbroken run of own stones on each side of the centre."""
+    right = np.zeros(own.shape[0], dtype=np.int8)
+    alive = np.ones(own.shape[0], dtype=bool)
+    for step in range(1, reach + 1):
+        alive &= own[:, center + step]
+        right += alive
+    
+    left = np.zeros(own.shape[0], dtype=np.int8)
+    alive = np.ones(own.shape[0], dtype=bool)
+    for step in range(1, reach + 1):
+        alive &= own[:, center - step]
+        left += alive
+    
+    return left, right
+
+
+def _matches(cells: np.ndarray, start: int, pattern: List[int]) -> np.ndarray:
+    """Rows whose cells starting at column start equal the pattern."""
+    result = np.ones(cells.shape[0], dtype=bool)
+    for i, value in enumerate(pattern):
+        result &= cells[:, start + i] == value
+    return result
+
+
+def build_rule_table() -> np.ndarray:
+    """
+    Classify every rule window with a black stone placed at the centre.
+    Open threes and fours follow the RenjuRuleEngine definitions.
+    """
+    center = RULE_RADIUS
+    cells = _decode_all(RULE_RADIUS)
+    cells[:, center] = Stone.BLACK
+    
+    # Open three: _XXX_ inside the cells from offset -3 to +2
+    three = _matches(cells, center - 3, [0, 1, 1, 1, 0]) | _matches(cells, center - 2, [0, 1, 1, 1, 0])
+    
+    # Open four: _XXXX_ inside offsets -3..+3, or XXXX with one open end whose
+    # outer neighbour (within the same cells) is not white
+    four = _matches(cells, center - 3, [0, 1, 1, 1, 1, 0]) | _matches(cells, center - 2, [0, 1, 1, 1, 1, 0])
+    for i in range(3):
+        start = center - 3 + i
+        if i > 0:
+            four |= _matches(cells, start, [0, 1, 1, 1, 1]) & (cells[:, start - 1] != Stone.WHITE)
+        if i + 5 < 7:
+            four |= _matches(cells, start, [1, 1, 1, 1, 0]) & (cells[:, start + 5] != Stone.WHITE)
+    
+    left, right = _run_lengths(cells == Stone.BLACK, center, RULE_RADIUS)
+    count = 1 + left + right
+    
+    flags = np.zeros(cells.shape[0], dtype=np.uint8)
+    flags[three] |= OPEN_THREE
+    flags[four] |= OPEN_FOUR
+    flags[count == 5] |= FIVE
+    flags[count >= 6] |= OVERLINE
+    return flags
+
+
+def build_shape_table() -> np.ndarray:
+    """
+    Classify every shape window for a stone of each colour at the centre.
+    Returns a (3, N) array indexed by [stone, code]; row 0 is unused.
+    """
+    center = SHAPE_RADIUS
+    cells = _decode_all(SHAPE_RADIUS)
+    shapes = np.zeros((3, cells.shape[0]), dtype=np.uint8)
+    
+    for stone in (Stone.BLACK, Stone.WHITE):
+        cells[:, center] = stone
+        left, right = _run_lengths(cells == stone, center, SHAPE_RADIUS)
+        count = 1 + left + right
+        
+        # The run ends lie inside the window whenever count < 5
+        rows = np.arange(cells.shape[0])
+        right_end = np.minimum(center + right + 1, 2 * center)
+        left_end = np.maximum(center - left - 1, 0)
+        is_open = (cells[rows, right_end] == 0) & (cells[rows, left_end] == 0)
+        
+        shape = np.full(cells.shape[0], SHAPE_NONE, dtype=np.uint8)
+        for length, closed_shape, open_shape in ((2, SHAPE_TWO, SHAPE_OPEN_TWO),
+                                                 (3, SHAPE_THREE, SHAPE_OPEN_THREE),
+                                                 (4, SHAPE_FOUR, SHAPE_OPEN_FOUR)):
+            shape[(count == length) & ~is_open] = closed_shape
+            shape[(count == length) & is_open] = open_shape
+        shape[count >= 5] = SHAPE_FIVE
+        shapes[stone] = shape
+    
+    return shapes
+
+
+def cache_directory() -> str:
+    """Directory for Omok-Lab's on-disk caches (OMOK_LAB_CACHE_DIR overrides it)."""
+    cache_dir = os.environ.get('OMOK_LAB_CACHE_DIR')
+    if not cache_dir:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        cache_dir = os.path.join(base, 'omok-lab')
+    return cache_dir
+
+
+def _cache_path() -> str:
+    """Location of the on-disk table cache."""
+    return os.path.join(cache_directory(), f'patterns-v{CACHE_VERSION}.npz')
+
+
+def _load_tables() -> Tuple[np.ndarray, np.ndarray]:
+    """Load the tables from the cache, building and saving them if needed."""
+    path = _cache_path()
+    try:
+        with np.load(path) as data:
+            rule_flags, shapes = data['rule_flags'], data['shapes']
+        if rule_flags.shape == (4 ** (2 * RULE_RADIUS),) and shapes.shape == (3, 4 ** (2 * SHAPE_RADIUS)):
+            return rule_flags, shapes
+    except (OSError, KeyError, ValueError):
+        pass
+    
+    rule_flags = build_rule_table()
+    shapes = build_shape_table()
+    
+    # A missing or read-only cache only costs the rebuild time
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.tmp.npz'
+        np.savez(temp_path, rule_flags=rule_flags, shapes=shapes)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+    
+    return rule_flags, shapes
+
+
+RULE_FLAG_TABLE, SHAPE_TABLE = _load_tables()
+
+# Plain lists index faster than NumPy arrays from Python code
+RULE_FLAGS = RULE_FLAG_TABLE.tolist()
+SHAPES = SHAPE_TABLE.tolist()
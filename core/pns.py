@@ -0,0 +1,378 @@
+"""
+Depth-first proof-number (df-pn) search for solving positions.
+Proves or disproves that a player can force a win, for post-game analysis.
+"""
+
+from typing import Dict, List, Optional, Tuple
+from .board import Board, Stone
+from .rule_engine import RenjuRuleEngine
+from .vcf import VCFSolver
+import pickle
+import time
+
+
+class ProofResult:
+    """Outcome of a proof-number search."""
+    
+    def __init__(self, result: str, best_move: Optional[Tuple[int, int]],
+                 nodes: int, proof_size: int, table_size: int, elapsed: float):
+        self.result = result            # ProofNumberSearch.WIN, LOSS or UNKNOWN
+        self.best_move = best_move      # Winning move when the result is a win
+        self.nodes = nodes              # Nodes expanded by this call
+        self.proof_size = proof_size    # Nodes in the proof (or disproof) tree
+        self.table_size = table_size    # Entries in the proof table afterwards
+        self.elapsed = elapsed
+    
+    def __repr__(self) -> str:
+        return (f"ProofResult({self.result}, move={self.best_move}, nodes={self.nodes}, "
+                f"proof_size={self.proof_size})")
+
+
+class ProofNumberSearch:
+    """
+    df-pn solver over a Board, using the Renju rules for legality.
+    The prover is limited to fours and threes, so a failed proof is not a
+    disproof; losses are proven from the opponent's side instead. The
+    defender always gets every legal reply, so a WIN is a proof.
+    """
+    
+    WIN = "win"
+    LOSS = "loss"
+    UNKNOWN = "unknown"
+    
+    # Far above any real sum of proof numbers, which grow quickly on a
+    # DAG; Python integers never overflow
+    INFINITY = 1 << 128
+    
+    # The clock is read once every TIME_CHECK_MASK + 1 nodes
+    TIME_CHECK_MASK = 255
+    
+    # Format of the files written by save()
+    TABLE_VERSION = 2
+    
+    # Initial disproof number of an unexpanded prover move that is not a four;
+    # the defender has many replies to a three but only one to a four
+    THREE_DISPROOF = 4
+    
+    def __init__(self, board: Board, rule_engine: Optional[RenjuRuleEngine] = None,
+                 max_entries: int = 500000, node_limit: int = 200000,
+                 time_limit: Optional[float] = None):
+        """
+        max_entries bounds each proof table; node_limit and time_limit bound
+        each solve() call. The tables are kept between calls, so calling
+        solve() again resumes an unfinished analysis.
+        """
+        self.board = board
+        self.rule_engine = rule_engine or RenjuRuleEngine(board)
+        self.max_entries = max_entries
+        self.node_limit = node_limit
+        self.time_limit = time_limit
+        
+        # A VCF is a proof in itself and is found far faster by the narrow solver
+        self.vcf = VCFSolver(board, self.rule_engine)
+        
+        # One table per prover, as draws count against the prover:
+        # Zobrist key -> [phi, delta, work]. phi is the proof number of
+        # "the side to move wins" and delta its disproof number.
+        self.tables: Dict[Stone, Dict[int, List[int]]] = {Stone.BLACK: {}, Stone.WHITE: {}}
+        self.table = self.tables[Stone.BLACK]
+        self.prover: Optional[Stone] = None
+        self.nodes = 0
+        self.deadline = None
+        self.aborted = False
+    
+    def solve(self, stone: Stone) -> ProofResult:
+        """
+        Decide whether the given stone, which is to move, can force a win.
+        A quick VCF search runs first, then df-pn. A loss is only reported
+        once the opponent's win is proven too; anything else unresolved
+        within the limits is UNKNOWN.
+        """
+        start = time.time()
+        self.nodes = 0
+        self.deadline = start + self.time_limit if self.time_limit else None
+        self.aborted = False
+        
+        line = self.vcf.solve(stone)
+        if line:
+            return ProofResult(self.WIN, line[0], self.vcf.nodes, len(line),
+                               len(self.table), time.time() - start)
+        
+        phi, delta = self._run(stone, prover_to_move=True)
+        result = self.UNKNOWN
+        proof_size = 0
+        
+        if phi == 0:
+            result = self.WIN
+            proof_size = self._proof_size(stone, set())
+        elif delta == 0 and not self.aborted:
+            # No forced win; check whether the opponent forces one instead
+            opponent = self._opponent(stone)
+            phi, delta = self._run(opponent, prover_to_move=False)
+            if delta == 0:
+                result = self.LOSS
+                proof_size = self._proof_size(stone, set())
+        
+        best_move = self._best_move(stone) if result == self.WIN else None
+        return ProofResult(result, best_move, self.nodes, proof_size,
+                           len(self.table), time.time() - start)
+    
+    def save(self, path: str):
+        """Write the proof tables to a file so the analysis can be resumed later."""
+        with open(path, 'wb') as f:
+            pickle.dump({'version': self.TABLE_VERSION,
+                         'tables': {int(stone): table for stone, table in self.tables.items()}}, f)
+    
+    def load(self, path: str):
+        """Restore proof tables written by save()."""
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+        if not isinstance(data, dict) or data.get('version') != self.TABLE_VERSION:
+            raise ValueError(f"{path} is not a version {self.TABLE_VERSION} proof table")
+        for stone, table in data['tables'].items():
+            self.tables[Stone(stone)] = table
+        self.prover = None
+        self.table = self.tables[Stone.BLACK]
+    
+    def _run(self, prover: Stone, prover_to_move: bool) -> Tuple[int, int]:
+        """
+        Search the root until it is resolved or a limit is reached.
+        Returns the root's (phi, delta) for the side to move.
+        """
+        self.prover = prover
+        self.table = self.tables[prover]
+        
+        mover = prover if prover_to_move else self._opponent(prover)
+        phi, delta = self._mid(mover, self.INFINITY, self.INFINITY)
+        return phi, delta
+    
+    def _mid(self, mover: Stone, phi_limit: int, delta_limit: int) -> Tuple[int, int]:
+        """
+        Multiple iterative deepening at one node: expand the most proving
+        child until the node's numbers reach the thresholds.
+        """
+        self.nodes += 1
+        if self.nodes >= self.node_limit:
+            self.aborted = True
+        elif (self.deadline is not None and self.nodes & self.TIME_CHECK_MASK == 0
+              and time.time() > self.deadline):
+            self.aborted = True
+        
+        key = self.board.zobrist_key
+        moves, terminal = self._generate(mover)
+        if terminal is not None:
+            self._store(key, terminal[0], terminal[1], 1)
+            return terminal
+        
+        opponent = self._opponent(mover)
+        work_start = self.nodes
+        
+        # Prover fours get the forced reply, so they look cheaper than threes
+        fours = self.board.threat_mask(mover, 2) if mover == self.prover else -1
+        
+        while True:
+            phi, delta, best, second_delta, best_phi = self._combine(key, moves, mover, fours)
+            if phi >= phi_limit or delta >= delta_limit or self.aborted:
+                self._store(key, phi, delta, self.nodes - work_start + 1)
+                return phi, delta
+            
+            # Forbidden moves are only checked once they are about to be played
+            row, col = best
+            if mover == Stone.BLACK and self.rule_engine.is_forbidden_move(row, col, mover):
+                moves.remove(best)
+                if not moves:
+                    self._store(key, self.INFINITY, 0, 1)
+                    return self.INFINITY, 0
+                continue
+            
+            # Child thresholds for the most promising move
+            child_phi_limit = min(self.INFINITY, delta_limit - delta + best_phi)
+            child_delta_limit = min(phi_limit, second_delta + 1)
+            
+            self.board.make_move(row, col, mover)
+            self._mid(opponent, child_phi_limit, child_delta_limit)
+            self.board.unmake_move(row, col)
+    
+    def _combine(self, key: int, moves: List[Tuple[int, int]], mover: Stone, fours: int):
+        """
+        Derive a node's numbers from its children's table entries.
+        Returns (phi, delta, best move, second smallest child delta, best child phi).
+        """
+        delta = 0
+        best = None
+        best_delta = self.INFINITY
+        second_delta = self.INFINITY
+        best_phi = 0
+        
+        for row, col in moves:
+            child_key = key ^ Board.ZOBRIST[row * Board.SIZE + col][mover]
+            entry = self.table.get(child_key)
+            if entry is not None:
+                child_phi, child_delta = entry[0], entry[1]
+            elif fours >> (row * Board.STRIDE + col) & 1:
+                child_phi, child_delta = 1, 1
+            else:
+                child_phi, child_delta = 1, self.THREE_DISPROOF
+            
+            delta = min(self.INFINITY, delta + child_phi)
+            if best is None or child_delta < best_delta:
+                second_delta = best_delta
+                best_delta = child_delta
+                best = (row, col)
+                best_phi = child_phi
+            elif child_delta < second_delta:
+                second_delta = child_delta
+        
+        return best_delta, delta, best, second_delta, best_phi
+    
+    def _generate(self, mover: Stone):
+        """
+        Moves worth considering for the side to move, and the (phi, delta)
+        pair if the position is already decided. Black's forbidden moves are
+        left in and filtered by the caller.
+        Only moves that cannot be refuted trivially are returned: a threatened
+        five must be blocked, and against two fives only fours help. The
+        prover only plays fours and threes; the defender gets every other
+        legal move, narrowed only by _defences() when the prover threatens
+        an open four.
+        """
+        opponent = self._opponent(mover)
+        
+        if self.rule_engine.five_points(mover):
+            return [], (0, self.INFINITY)
+        
+        threats = self.rule_engine.five_points(opponent)
+        if len(threats) == 1:
+            moves = threats
+        elif threats:
+            moves = self.board.mask_positions(self.board.threat_mask(mover, 2))
+        elif mover == self.prover:
+            threat_cells = self.board.threat_mask(mover, 2) | self.board.threat_mask(mover, 3)
+            moves = self.board.mask_positions(threat_cells)
+        else:
+            moves = self._defences(mover, opponent)
+            if moves is None:
+                moves = self.board.get_empty_positions()
+                if not moves:
+                    # A full board is a draw, which counts against the prover
+                    return [], self._draw(mover)
+        
+        if not moves:
+            return [], (self.INFINITY, 0)
+        return moves, None
+    
+    def _defences(self, defender: Stone, prover: Stone) -> Optional[List[Tuple[int, int]]]:
+        """
+        The defender's replies that do not lose at once to an open four, or
+        None if the prover threatens none. Without a five of its own, the
+        defender must either make a four or play within the rule window of
+        every open-four point; anywhere else the open four is still there.
+        """
+        points = self.board.mask_positions(self.board.open_four_mask(prover))
+        if prover == Stone.BLACK:
+            points = [(row, col) for row, col in points
+                      if not self.rule_engine.is_forbidden_move(row, col, prover)]
+        if not points:
+            return None
+        
+        # Cells that touch the window of every open-four point
+        cells = None
+        for row, col in points:
+            window = set(self.rule_engine.AFFECTED_CELLS[row * Board.SIZE + col])
+            cells = window if cells is None else cells & window
+        moves = [divmod(index, Board.SIZE) for index in sorted(cells)]
+        moves = [move for move in moves if self.board.is_empty(*move)]
+        
+        counter_fours = self.board.mask_positions(self.board.threat_mask(defender, 2))
+        return moves + [move for move in counter_fours if move not in moves]
+    
+    def _draw(self, mover: Stone) -> Tuple[int, int]:
+        """Numbers of a drawn position for the side to move."""
+        if mover == self.prover:
+            return self.INFINITY, 0
+        return 0, self.INFINITY
+    
+    def _store(self, key: int, phi: int, delta: int, work: int):
+        """Record a node's numbers, collecting garbage when the table is full."""
+        entry = self.table.get(key)
+        if entry is not None:
+            entry[0], entry[1] = phi, delta
+            entry[2] += work
+            return
+        
+        if len(self.table) >= self.max_entries:
+            self._collect_garbage()
+        self.table[key] = [phi, delta, work]
+    
+    def _collect_garbage(self):
+        """
+        Free half of the table. Unresolved entries with the least work behind
+        them go first; proven and disproven entries are kept when possible.
+        """
+        def keep_priority(item):
+            phi, delta, work = item[1]
+            resolved = phi == 0 or delta == 0
+            return (resolved, work)
+        
+        entries = sorted(self.table.items(), key=keep_priority, reverse=True)
+        self.table = self.tables[self.prover] = dict(entries[:self.max_entries // 2])
+    
+    def _proof_size(self, mover: Stone, seen: set) -> int:
+        """
+        Count the nodes of the proof tree below the current position.
+        Where the side to move wins one winning child is followed, otherwise
+        every child is. Evicted entries make this a lower bound.
+        """
+        key = self.board.zobrist_key
+        if key in seen:
+            return 0
+        seen.add(key)
+        
+        moves, terminal = self._generate(mover)
+        if terminal is not None:
+            return 1
+        
+        entry = self.table.get(key)
+        if entry is None or (entry[0] != 0 and entry[1] != 0):
+            return 1
+        
+        opponent = self._opponent(mover)
+        if entry[0] == 0:
+            # Side to move wins: follow one child the opponent loses in
+            move = self._winning_child(mover, moves)
+            moves = [move] if move is not None else []
+        
+        size = 1
+        for row, col in moves:
+            if mover == Stone.BLACK and self.rule_engine.is_forbidden_move(row, col, mover):
+                continue
+            self.board.make_move(row, col, mover)
+            size += self._proof_size(opponent, seen)
+            self.board.unmake_move(row, col)
+        
+        return size
+    
+    def _best_move(self, mover: Stone) -> Optional[Tuple[int, int]]:
+        """A move that keeps a proven win."""
+        fives = self.rule_engine.five_points(mover)
+        if fives:
+            return fives[0]
+        
+        moves, _ = self._generate(mover)
+        return self._winning_child(mover, moves)
+    
+    def _winning_child(self, mover: Stone, moves: List[Tuple[int, int]]) -> Optional[Tuple[int, int]]:
+        """A legal move into a position proven lost for the opponent."""
+        key = self.board.zobrist_key
+        for row, col in moves:
+            child = self.table.get(key ^ Board.ZOBRIST[row * Board.SIZE + col][mover])
+            if child is None or child[1] != 0:
+                continue
+            if mover == Stone.BLACK and self.rule_engine.is_forbidden_move(row, col, mover):
+                continue
+            return (row, col)
+        return None
+    
+    def _opponent(self, stone: Stone) -> Stone:
+        """Return the other colour."""
+        return Stone.WHITE if stone == Stone.BLACK else Stone.BLACK
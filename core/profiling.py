@@ -0,0 +1,211 @@
+"""
+Opt-in profiling of the engine's entry points.
+
+Nothing is wrapped until enable() is called, so profiling costs nothing
+when it is off. Once enabled, MinimaxAI.get_best_move, PositionEvaluator
+.evaluate and the RenjuRuleEngine entry points are timed, and every
+get_best_move prints a breakdown of its time to stderr. With a profile
+directory, each get_best_move also runs under cProfile and its stats are
+dumped there, keeping only the newest files.
+
+Set OMOK_PROFILE=1 to enable timing in any process that imports the
+engine, and OMOK_PROFILE_DIR to collect cProfile dumps as well
+(OMOK_PROFILE_KEEP sets how many are kept).
+"""
+
+import atexit
+import cProfile
+import functools
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+# Timed entry points as (module, class, method names)
+TARGETS = [
+    ('core.minimax', 'MinimaxAI', ('get_best_move',)),
+    ('core.evaluator', 'PositionEvaluator', ('evaluate',)),
+    ('core.rule_engine', 'RenjuRuleEngine', ('is_forbidden_move', 'get_all_forbidden_positions',
+                                             'five_points', 'get_forbidden_reason')),
+]
+
+DEFAULT_KEEP = 20
+
+_enabled = False
+_profile_dir: Optional[str] = None
+_keep = DEFAULT_KEEP
+_dump_count = 0
+_lock = threading.Lock()
+
+# Per-thread timers, so the hot wrappers never take a lock:
+# name -> [calls, total seconds, longest call]
+_local = threading.local()
+_all_timers: List[Dict[str, List[float]]] = []
+
+
+def _timers() -> Dict[str, List[float]]:
+    """The calling thread's timers."""
+    timers = getattr(_local, 'timers', None)
+    if timers is None:
+        timers = _local.timers = {}
+        with _lock:
+            _all_timers.append(timers)
+    return timers
+
+
+def _timed(name: str, function: Callable) -> Callable:
+    """Wrap a function to count its calls and time."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            timer = _timers().get(name)
+            if timer is None:
+                timer = _timers()[name] = [0, 0.0, 0.0]
+            timer[0] += 1
+            timer[1] += elapsed
+            if elapsed > timer[2]:
+                timer[2] = elapsed
+    
+    wrapper.__wrapped_for_profiling__ = True
+    return wrapper
+
+
+def _profiled_search(name: str, function: Callable) -> Callable:
+    """Wrap get_best_move: time it, report its breakdown and optionally run cProfile."""
+    timed = _timed(name, function)
+    
+    @functools.wraps(function)
+    def wrapper(self, *args, **kwargs):
+        before = {key: list(value) for key, value in _timers().items()}
+        profiler = cProfile.Profile() if _profile_dir else None
+        started = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            return timed(self, *args, **kwargs)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            elapsed = time.perf_counter() - started
+            path = _dump(profiler) if profiler is not None else None
+            _report_search(elapsed, before, self, path)
+    
+    wrapper.__wrapped_for_profiling__ = True
+    return wrapper
+
+
+def _report_search(elapsed: float, before: Dict[str, List[float]], ai, path: Optional[str]):
+    """Print the time of one search and of the entry points it called."""
+    parts = []
+    for key, (calls, total, _) in sorted(_timers().items()):
+        old_calls, old_total = before.get(key, [0, 0.0])[:2]
+        if calls > old_calls and not key.endswith('get_best_move'):
+            parts.append(f"{key} {total - old_total:.3f}s/{calls - old_calls}")
+    line = (f"[profile] get_best_move {elapsed:.3f}s depth {ai.completed_depth} "
+            f"nodes {ai.nodes_evaluated}: " + (', '.join(parts) or 'no engine calls'))
+    if path:
+        line += f" -> {path}"
+    print(line, file=sys.stderr, flush=True)
+
+
+def _dump(profiler: cProfile.Profile) -> Optional[str]:
+    """Write a cProfile dump to the profile directory and delete the oldest beyond _keep."""
+    global _dump_count
+    with _lock:
+        _dump_count += 1
+        number = _dump_count
+    name = f"move-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{number:04d}.prof"
+    path = os.path.join(_profile_dir, name)
+    try:
+        os.makedirs(_profile_dir, exist_ok=True)
+        profiler.dump_stats(path)
+        dumps = sorted((entry for entry in os.scandir(_profile_dir)
+                        if entry.name.startswith('move-') and entry.name.endswith('.prof')),
+                       key=lambda entry: entry.stat().st_mtime)
+        for entry in dumps[:-_keep] if _keep > 0 else dumps:
+            os.remove(entry.path)
+    except OSError:
+        return None
+    return path
+
+
+def enable(profile_dir: Optional[str] = None, keep: int = DEFAULT_KEEP):
+    """
+    Wrap the engine's entry points with timers. With profile_dir, every
+    get_best_move is also profiled with cProfile and dumped there, keeping
+    the newest keep dumps. Calling it again only updates the dump settings.
+    """
+    global _enabled, _profile_dir, _keep
+    _profile_dir = profile_dir
+    _keep = keep
+    if _enabled:
+        return
+    _enabled = True
+    
+    import importlib
+    for module_name, class_name, methods in TARGETS:
+        cls = getattr(importlib.import_module(module_name), class_name)
+        for method in methods:
+            function = getattr(cls, method)
+            if getattr(function, '__wrapped_for_profiling__', False):
+                continue
+            name = f'{class_name}.{method}'
+            wrap = _profiled_search if method == 'get_best_move' else _timed
+            setattr(cls, method, wrap(name, function))
+    
+    atexit.register(_report_totals)
+
+
+def enable_from_environment():
+    """Enable profiling if OMOK_PROFILE or OMOK_PROFILE_DIR is set."""
+    flag = os.environ.get('OMOK_PROFILE', '')
+    profile_dir = os.environ.get('OMOK_PROFILE_DIR') or None
+    if flag in ('', '0') and profile_dir is None:
+        return
+    try:
+        keep = int(os.environ.get('OMOK_PROFILE_KEEP', DEFAULT_KEEP))
+    except ValueError:
+        keep = DEFAULT_KEEP
+    enable(profile_dir, keep)
+
+
+def enable_for_children(profile_dir: Optional[str] = None):
+    """
+    Enable profiling here and in processes started from now on, which
+    inherit the environment (worker pools, arena games).
+    """
+    os.environ['OMOK_PROFILE'] = '1'
+    if profile_dir:
+        os.environ['OMOK_PROFILE_DIR'] = profile_dir
+    enable_from_environment()
+
+
+def totals() -> Dict[str, List[float]]:
+    """Calls, total seconds and longest call per entry point, over all threads."""
+    combined: Dict[str, List[float]] = {}
+    with _lock:
+        timer_sets = list(_all_timers)
+    for timers in timer_sets:
+        for name, (calls, total, longest) in list(timers.items()):
+            entry = combined.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += calls
+            entry[1] += total
+            entry[2] = max(entry[2], longest)
+    return combined
+
+
+def _report_totals():
+    """Print the totals of the process when it exits."""
+    combined = totals()
+    if not combined:
+        return
+    print(f"[profile] totals for process {os.getpid()}:", file=sys.stderr)
+    for name, (calls, total, longest) in sorted(combined.items(), key=lambda item: -item[1][1]):
+        print(f"[profile]   {name:<42} {calls:>10} calls {total:>9.3f}s "
+              f"avg {total / calls * 1e6:>9.1f}us max {longest * 1e3:>8.2f}ms", file=sys.stderr)
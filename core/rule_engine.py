@@ -5,13 +5,61 @@ Implements 3-3, 4-4, and overline detection for black stones.
 
 from typing import List, Tuple, Set
 from .board import Board, Stone
+from . import patterns
+
+
+def _build_affected_cells(radius: int) -> List[List[int]]:
+    """
+    For every cell index, the cells whose forbidden status can change when
+    that cell changes: the cell itself and its neighbours on the four lines
+    through it, up to the rule-window radius.
+    """
+    affected = []
+    for row in range(Board.SIZE):
+        for col in range(Board.SIZE):
+            cells = [row * Board.SIZE + col]
+            for dr, dc in Board.DIRECTIONS:
+                for offset in range(-radius, radius + 1):
+                    r, c = row + offset * dr, col + offset * dc
+                    if offset != 0 and Board.SIZE > r >= 0 and Board.SIZE > c >= 0:
+                        cells.append(r * Board.SIZE + c)
+            affected.append(cells)
+    return affected
 
 
 class RenjuRuleEngine:
     """Enforces Renju rules for the game."""
     
-    def __init__(self, board: Board):
+    AFFECTED_CELLS = _build_affected_cells(patterns.RULE_RADIUS)
+    
+    def __init__(self, board: Board, incremental: bool = False):
+        """
+        In incremental mode the engine listens to board changes and caches
+        the forbidden status of every cell, recomputing only cells on the
+        lines through a changed cell.
+        """
         self.board = board
+        self.incremental = incremental
+        
+        if incremental:
+            self._forbidden: Set[int] = set()
+            self._dirty: Set[int] = set(range(Board.SIZE * Board.SIZE))
+            board.add_listener(self)
+    
+    def detach(self):
+        """Stop listening to the board; checks go back to being computed each time."""
+        if self.incremental:
+            self.board.remove_listener(self)
+            self.incremental = False
+    
+    def on_reset(self):
+        """Board listener: the board was cleared."""
+        self._forbidden.clear()
+        self._dirty = set(range(Board.SIZE * Board.SIZE))
+    
+    def on_cell_changed(self, row: int, col: int, old: int, new: int):
+        """Board listener: invalidate the cells a change can affect."""
+        self._dirty.update(self.AFFECTED_CELLS[row * Board.SIZE + col])
     
     def is_forbidden_move(self, row: int, col: int, stone: Stone) -> bool:
         """
@@ -21,17 +69,29 @@ class RenjuRuleEngine:
         if stone != Stone.BLACK:
             return False
         
-        # Temporarily place the stone
-        original = self.board.grid[row, col]
-        self.board.grid[row, col] = stone
+        # The cache only holds empty cells
+        if self.incremental and self.board.is_empty(row, col):
+            index = row * Board.SIZE + col
+            if index not in self._dirty:
+                return index in self._forbidden
+            self._dirty.discard(index)
+            if self._check_forbidden(row, col):
+                self._forbidden.add(index)
+                return True
+            self._forbidden.discard(index)
+            return False
         
-        # Check all forbidden patterns
-        is_33 = self._is_double_three(row, col)
-        is_44 = self._is_double_four(row, col)
-        is_overline = self._is_overline(row, col)
+        return self._check_forbidden(row, col)
+    
+    def _check_forbidden(self, row: int, col: int) -> bool:
+        """Classify the cell for black without consulting the cache."""
+        # Classify the four lines through the cell as if black played there
+        flags = self._direction_flags(row, col)
         
-        # Restore original state
-        self.board.grid[row, col] = original
+        # Check all forbidden patterns
+        is_33 = self._is_double_three(flags)
+        is_44 = self._is_double_four(flags)
+        is_overline = self._is_overline(flags)
         
         return is_33 or is_44 or is_overline
     
@@ -40,162 +100,74 @@ class RenjuRuleEngine:
         if stone != Stone.BLACK:
             return set()
         
+        if self.incremental:
+            # Only cells near the moves since the last call are rechecked
+            for index in self._dirty:
+                row, col = divmod(index, Board.SIZE)
+                if self.board.is_empty(row, col) and self._check_forbidden(row, col):
+                    self._forbidden.add(index)
+                else:
+                    self._forbidden.discard(index)
+            self._dirty.clear()
+            return {divmod(index, Board.SIZE) for index in self._forbidden}
+        
         forbidden = set()
-        for row in range(Board.SIZE):
-            for col in range(Board.SIZE):
-                if self.board.is_empty(row, col):
-                    if self.is_forbidden_move(row, col, stone):
-                        forbidden.add((row, col))
+        for row, col in self.board.get_empty_positions():
+            if self.is_forbidden_move(row, col, stone):
+                forbidden.add((row, col))
         
         return forbidden
     
-    def _is_overline(self, row: int, col: int) -> bool:
-        """Check if the move creates 6 or more consecutive stones (overline)."""
-        for direction in Board.DIRECTIONS:
-            count = self.board.count_consecutive(row, col, Stone.BLACK, direction)
-            if count >= 6:
-                return True
-        return False
-    
-    def _is_double_three(self, row: int, col: int) -> bool:
-        """Check if the move creates two or more open threes (3-3)."""
-        open_threes = 0
-        
-        for direction in Board.DIRECTIONS:
-            if self._is_open_three(row, col, direction):
-                open_threes += 1
-                if open_threes >= 2:
-                    return True
-        
-        return False
-    
-    def _is_double_four(self, row: int, col: int) -> bool:
-        """Check if the move creates two or more open fours (4-4)."""
-        open_fours = 0
-        
-        for direction in Board.DIRECTIONS:
-            if self._is_open_four(row, col, direction):
-                open_fours += 1
-                if open_fours >= 2:
-                    return True
-        
-        return False
-    
-    def _is_open_three(self, row: int, col: int, direction: Tuple[int, int]) -> bool:
+    def five_points(self, stone: Stone) -> List[Tuple[int, int]]:
         """
-        Check if there's an open three in the given direction.
-        An open three means exactly 3 consecutive stones with both ends open,
-        and can become a five in one more move.
+        Get the empty positions where the stone would complete a winning five.
+        Black only wins with exactly five, so overlines are left out.
         """
-        dr, dc = direction
-        pattern = self._get_pattern(row, col, direction, 6)
-        
-        # Open three patterns (X = black, _ = empty, ? = any)
-        # _XXX_ (basic open three)
-        open_three_patterns = [
-            [0, 1, 1, 1, 0],  # _XXX_
-        ]
-        
-        # Check if pattern matches any open three
-        for i in range(len(pattern) - 4):
-            segment = pattern[i:i+5]
-            if segment in open_three_patterns:
-                # Verify it can become a five
-                if self._can_become_five(row, col, direction, segment, i):
-                    return True
+        points = self.board.mask_positions(self.board.threat_mask(stone, 1))
+        if stone != Stone.BLACK:
+            return points
         
-        return False
+        return [(row, col) for row, col in points
+                if any(flag & patterns.FIVE for flag in self._direction_flags(row, col))]
     
-    def _is_open_four(self, row: int, col: int, direction: Tuple[int, int]) -> bool:
+    def _direction_flags(self, row: int, col: int) -> List[int]:
         """
-        Check if there's an open four in the given direction.
-        An open four means exactly 4 consecutive stones with at least one end open,
-        guaranteeing a win in the next move.
+        Look up the pattern flags of each direction for a black stone at (row, col).
+        The board itself is not modified.
         """
-        dr, dc = direction
-        pattern = self._get_pattern(row, col, direction, 7)
-        
-        # Open four patterns
-        # _XXXX_ (both ends open)
-        # _XXXX (one end open)
-        open_four_patterns = [
-            [0, 1, 1, 1, 1, 0],  # _XXXX_
-        ]
-        
-        for i in range(len(pattern) - 5):
-            segment = pattern[i:i+6]
-            if segment == open_four_patterns[0]:
-                return True
-        
-        # Check for one-end-open four
-        for i in range(len(pattern) - 4):
-            segment = pattern[i:i+5]
-            if segment == [0, 1, 1, 1, 1] or segment == [1, 1, 1, 1, 0]:
-                # Make sure it's not blocked on the open end
-                if segment[0] == 0:  # Open on left
-                    if i > 0 and pattern[i-1] != 2:  # Not blocked by white
-                        return True
-                if segment[-1] == 0:  # Open on right
-                    if i + 5 < len(pattern) and pattern[i+5] != 2:
-                        return True
-        
-        return False
+        codes = patterns.encode_windows(self.board, row, col, patterns.RULE_RADIUS)
+        return [patterns.RULE_FLAGS[code] for code in codes]
     
-    def _get_pattern(self, row: int, col: int, direction: Tuple[int, int], 
-                     length: int) -> List[int]:
-        """
-        Get a pattern of stones in the given direction.
-        Returns a list where 0=empty, 1=black, 2=white, -1=out of bounds.
-        """
-        dr, dc = direction
-        pattern = []
-        
-        # Get pattern centered on (row, col)
-        start_offset = -(length // 2)
-        for i in range(length):
-            r = row + (start_offset + i) * dr
-            c = col + (start_offset + i) * dc
-            
-            if not self.board.is_valid_position(r, c):
-                pattern.append(-1)  # Out of bounds
-            else:
-                pattern.append(int(self.board.grid[r, c]))
-        
-        return pattern
+    def _is_overline(self, flags: List[int]) -> bool:
+        """Check if the move creates 6 or more consecutive stones (overline)."""
+        return any(flag & patterns.OVERLINE for flag in flags)
     
-    def _can_become_five(self, row: int, col: int, direction: Tuple[int, int],
-                        segment: List[int], offset: int) -> bool:
-        """Check if an open three can become a five."""
-        # For a true open three, adding one stone on either end should create a four
-        # This is a simplified check - in reality, we'd need to verify
-        # that the resulting four is also open
-        
-        # Count how many empty spaces are adjacent
-        empty_count = segment.count(0)
-        black_count = segment.count(1)
-        
-        # A valid open three has exactly 3 blacks and 2 empties on the ends
-        return black_count == 3 and empty_count == 2
+    def _is_double_three(self, flags: List[int]) -> bool:
+        """Check if the move creates two or more open threes (3-3)."""
+        open_threes = sum(1 for flag in flags if flag & patterns.OPEN_THREE)
+        return open_threes >= 2
+    
+    def _is_double_four(self, flags: List[int]) -> bool:
+        """Check if the move creates two or more open fours (4-4)."""
+        open_fours = sum(1 for flag in flags if flag & patterns.OPEN_FOUR)
+        return open_fours >= 2
     
     def get_forbidden_reason(self, row: int, col: int, stone: Stone) -> str:
         """Get a human-readable reason why a move is forbidden."""
         if stone != Stone.BLACK:
             return ""
         
-        original = self.board.grid[row, col]
-        self.board.grid[row, col] = stone
+        flags = self._direction_flags(row, col)
         
         reasons = []
         
-        if self._is_double_three(row, col):
+        if self._is_double_three(flags):
             reasons.append("Double Three (3-3)")
         
-        if self._is_double_four(row, col):
+        if self._is_double_four(flags):
             reasons.append("Double Four (4-4)")
         
-        if self._is_overline(row, col):
+        if self._is_overline(flags):
             reasons.append("Overline (6+ stones)")
         
-        self.board.grid[row, col] = original
-        
         return ", ".join(reasons) if reasons else ""
@@ -0,0 +1,75 @@
+"""
+Transposition table for the AI search.
+Caches search results by Zobrist key so that positions reached through
+different move orders are only searched once.
+"""
+
+from typing import Optional, Tuple
+
+
+class TranspositionTable:
+    """Fixed-size hash table of search results with depth-preferred replacement."""
+    
+    # Bound types
+    EXACT = 0
+    LOWER_BOUND = 1  # Score is at least the stored value (fail high)
+    UPPER_BOUND = 2  # Score is at most the stored value (fail low)
+    
+    def __init__(self, size_bits: int = 17):
+        """
+        Create a table with 2**size_bits slots.
+        The table never grows, so memory use is bounded by the slot count.
+        """
+        self.size = 1 << size_bits
+        self.mask = self.size - 1
+        self.entries = [None] * self.size
+        self.generation = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+    
+    def clear(self):
+        """Remove all entries."""
+        self.entries = [None] * self.size
+        self.generation = 0
+    
+    def new_search(self):
+        """Age existing entries so the next search may overwrite them."""
+        self.generation += 1
+    
+    def probe(self, key: int) -> Optional[Tuple[int, int, float, Optional[Tuple[int, int]]]]:
+        """
+        Look up a position.
+        Returns (depth, bound, score, best_move) or None if the key is not stored.
+        """
+        self.probes += 1
+        entry = self.entries[key & self.mask]
+        if entry is None or entry[0] != key:
+            return None
+        
+        self.hits += 1
+        return entry[1], entry[2], entry[3], entry[4]
+    
+    def store(self, key: int, depth: int, bound: int, score: float,
+              best_move: Optional[Tuple[int, int]]):
+        """
+        Store a search result.
+        An occupied slot is only replaced by the same position, by a search at
+        least as deep, or when the stored entry is left over from an older search.
+        """
+        index = key & self.mask
+        entry = self.entries[index]
+        if (entry is not None and entry[0] != key
+                and entry[5] == self.generation and entry[1] > depth):
+            return
+        
+        if best_move is None and entry is not None and entry[0] == key:
+            # Keep the previous best move for ordering
+            best_move = entry[4]
+        
+        self.entries[index] = (key, depth, bound, score, best_move, self.generation)
+        self.stores += 1
+    
+    def hit_rate(self) -> float:
+        """Fraction of probes that found their position."""
+        return self.hits / self.probes if self.probes else 0.0
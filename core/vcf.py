@@ -0,0 +1,158 @@
+"""
+VCF (victory by continuous fours) solver.
+Searches only four-making attacker moves and the forced single replies,
+which finds long but narrow forced wins far faster than full-width search.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+from .board import Board, Stone
+from .rule_engine import RenjuRuleEngine
+import time
+
+
+class VCFSolver:
+    """Threat-space solver that proves wins made entirely of fours."""
+    
+    # The clock is read once every TIME_CHECK_MASK + 1 nodes; a solver node
+    # costs about a millisecond, so reading it often is cheap
+    TIME_CHECK_MASK = 7
+    
+    # Default number of attacker moves in a sequence
+    MAX_VCF_DEPTH = 15
+    
+    def __init__(self, board: Board, rule_engine: Optional[RenjuRuleEngine] = None,
+                 max_depth: int = MAX_VCF_DEPTH, node_limit: int = 20000, time_limit: float = 1.0):
+        """
+        max_depth is the number of attacker moves in a sequence, node_limit
+        and time_limit bound the work done by one solve() call.
+        """
+        self.board = board
+        self.rule_engine = rule_engine or RenjuRuleEngine(board)
+        self.max_depth = max_depth
+        self.node_limit = node_limit
+        self.time_limit = time_limit
+        
+        # Zobrist key -> deepest search that found no win from that position
+        self.cache: Dict[int, int] = {}
+        self.cache_attacker: Optional[Stone] = None
+        self.nodes = 0
+        self.deadline = 0
+        self.aborted = False
+        
+        # Optional callable checked with the clock; returning True stops the
+        # solve, so an owning search can pass on its deadline and cancellation
+        self.interrupt: Optional[Callable[[], bool]] = None
+    
+    def solve(self, attacker: Stone) -> Optional[List[Tuple[int, int]]]:
+        """
+        Look for a VCF for the attacker, who is to move.
+        Returns the winning sequence (attacker and defender moves alternating,
+        starting with the attacker) or None if no VCF was found within the
+        budget. A sequence may end with a four that cannot be blocked.
+        """
+        if self.cache_attacker != attacker:
+            self.cache.clear()
+            self.cache_attacker = attacker
+        
+        self.nodes = 0
+        self.deadline = time.time() + self.time_limit
+        self.aborted = False
+        
+        return self._attack(attacker, self._opponent(attacker), self.max_depth)
+    
+    def _attack(self, attacker: Stone, defender: Stone, depth: int) -> Optional[List[Tuple[int, int]]]:
+        """Search the attacker's threats from the current position."""
+        if self._out_of_budget():
+            return None
+        
+        # Win immediately if possible
+        fives = self.five_points(attacker)
+        if fives:
+            return [fives[0]]
+        
+        # The defender would win first unless every four blocks the defender's five
+        defender_fives = self.five_points(defender)
+        if len(defender_fives) > 1 or depth == 0:
+            return None
+        
+        # Symmetric variants of a position share one entry
+        key = self.board.canonical_key()[0]
+        if self.cache.get(key, -1) >= depth:
+            return None
+        
+        if defender_fives:
+            moves = defender_fives
+        else:
+            moves = self._attack_moves(attacker)
+        
+        for row, col in moves:
+            if attacker == Stone.BLACK and self.rule_engine.is_forbidden_move(row, col, attacker):
+                continue
+            
+            self.board.make_move(row, col, attacker)
+            line = self._respond(attacker, defender, row, col, depth)
+            self.board.unmake_move(row, col)
+            
+            if line is not None:
+                return [(row, col)] + line
+            if self.aborted:
+                return None
+        
+        self.cache[key] = depth
+        return None
+    
+    def _out_of_budget(self) -> bool:
+        """
+        Count a node and check the node limit and, every few nodes, the clock.
+        Every place that counts a node goes through here, so no clock check
+        is skipped. Sets aborted once the budget is spent.
+        """
+        self.nodes += 1
+        if self.nodes >= self.node_limit:
+            self.aborted = True
+        elif self.nodes & self.TIME_CHECK_MASK == 0:
+            if time.time() > self.deadline or (self.interrupt is not None and self.interrupt()):
+                self.aborted = True
+        return self.aborted
+    
+    def _attack_moves(self, attacker: Stone) -> List[Tuple[int, int]]:
+        """Candidate attacking moves: every cell that makes a four."""
+        return self.board.mask_positions(self.board.threat_mask(attacker, 2))
+    
+    def _respond(self, attacker: Stone, defender: Stone, row: int, col: int,
+                 depth: int) -> Optional[List[Tuple[int, int]]]:
+        """
+        Play the forced reply to the attacker's four at (row, col).
+        Returns the rest of the winning line, or None if the move is not
+        a winning four.
+        """
+        fives = self.five_points(attacker)
+        if not fives:
+            return None  # Not actually a four
+        
+        # A defender five comes before blocking
+        if self.five_points(defender):
+            return None
+        
+        if len(fives) > 1:
+            return []  # Open four or double four: cannot be blocked
+        
+        block_row, block_col = fives[0]
+        if defender == Stone.BLACK and self.rule_engine.is_forbidden_move(block_row, block_col, defender):
+            return []  # Black is not allowed to block there
+        
+        self.board.make_move(block_row, block_col, defender)
+        line = self._attack(attacker, defender, depth - 1)
+        self.board.unmake_move(block_row, block_col)
+        
+        if line is None:
+            return None
+        return [(block_row, block_col)] + line
+    
+    def five_points(self, stone: Stone) -> List[Tuple[int, int]]:
+        """Empty cells where the stone would complete a winning five."""
+        return self.rule_engine.five_points(stone)
+    
+    def _opponent(self, stone: Stone) -> Stone:
+        """Return the other colour."""
+        return Stone.WHITE if stone == Stone.BLACK else Stone.BLACK
@@ -0,0 +1,147 @@
+"""
+VCT (victory by continuous threats) solver.
+Extends the VCF search with open-three threats, enumerating every defender
+reply to a three, including counter-fours, so a found line is a proof.
+"""
+
+from typing import Dict, List, Optional, Tuple
+from .board import Board, Stone
+from .rule_engine import RenjuRuleEngine
+from .vcf import VCFSolver
+import time
+
+
+class VCTSolver(VCFSolver):
+    """Threat-space solver that proves wins made of fours and open threes."""
+    
+    def __init__(self, board: Board, rule_engine: Optional[RenjuRuleEngine] = None,
+                 max_depth: int = 6, node_limit: int = 20000, time_limit: float = 1.0):
+        super().__init__(board, rule_engine, max_depth, node_limit, time_limit)
+        self.use_threes = True
+        
+        # Zobrist key -> winning line found from that position
+        self.proven: Dict[int, List[Tuple[int, int]]] = {}
+    
+    def solve(self, attacker: Stone) -> Optional[List[Tuple[int, int]]]:
+        """
+        Look for a VCT for the attacker, who is to move.
+        A plain VCF is tried first, then threes are allowed with iterative
+        deepening, so short proofs are not buried under deep speculative lines.
+        Returns the main line of the proof (the first defence tried at each
+        three) or None if no VCT was found within the budget.
+        """
+        if self.cache_attacker != attacker:
+            self.cache.clear()
+            self.proven.clear()
+            self.cache_attacker = attacker
+        
+        self.nodes = 0
+        self.deadline = time.time() + self.time_limit
+        self.aborted = False
+        defender = self._opponent(attacker)
+        
+        # Failures found without threes do not hold once threes are allowed
+        self.use_threes = False
+        line = self._attack(attacker, defender, VCFSolver.MAX_VCF_DEPTH)
+        self.cache.clear()
+        if line is not None or self.aborted:
+            return line
+        
+        self.use_threes = True
+        for depth in range(1, self.max_depth + 1):
+            line = self._attack(attacker, defender, depth)
+            if line is not None or self.aborted:
+                return line
+        
+        return None
+    
+    def _attack(self, attacker: Stone, defender: Stone, depth: int) -> Optional[List[Tuple[int, int]]]:
+        """Search fours and threes, reusing lines already proven from this position."""
+        # Lines are stored in the canonical orientation and mapped back
+        key, symmetry = self.board.canonical_key()
+        line = self.proven.get(key)
+        if line is not None:
+            return [self.board.from_canonical(row, col, symmetry) for row, col in line]
+        
+        # A legal open four cannot be stopped once the defender has no five
+        if self.use_threes and not self.five_points(attacker) and not self.five_points(defender):
+            points = self.open_four_points(attacker)
+            if points:
+                return [points[0]]
+        
+        line = super()._attack(attacker, defender, depth)
+        if line is not None:
+            self.proven[key] = [self.board.to_canonical(row, col, symmetry) for row, col in line]
+        return line
+    
+    def _attack_moves(self, attacker: Stone) -> List[Tuple[int, int]]:
+        """Fours first, then every cell that could make a three."""
+        fours = super()._attack_moves(attacker)
+        if not self.use_threes:
+            return fours
+        threes = self.board.mask_positions(self.board.threat_mask(attacker, 3))
+        return fours + [move for move in threes if move not in fours]
+    
+    def _respond(self, attacker: Stone, defender: Stone, row: int, col: int,
+                 depth: int) -> Optional[List[Tuple[int, int]]]:
+        """Answer a four with the forced block and a three with every defence."""
+        if self.five_points(attacker):
+            return super()._respond(attacker, defender, row, col, depth)
+        if self.use_threes and self.open_four_points(attacker):
+            return self._defend_three(attacker, defender, row, col, depth)
+        return None  # Not a threat
+    
+    def _defend_three(self, attacker: Stone, defender: Stone, row: int, col: int,
+                      depth: int) -> Optional[List[Tuple[int, int]]]:
+        """
+        Try every defender reply to the three made at (row, col).
+        Replies are the cells near the three that stop the open four, plus
+        every counter-four anywhere on the board. The attacker must win
+        against all of them.
+        """
+        if self._out_of_budget():
+            return None
+        
+        # The defender wins first with a five of their own
+        if self.five_points(defender):
+            return None
+        
+        # Cells on the four lines through the threat, within the rule window
+        replies = []
+        for index in self.rule_engine.AFFECTED_CELLS[row * Board.SIZE + col]:
+            reply = divmod(index, Board.SIZE)
+            if self.board.is_empty(*reply):
+                replies.append(reply)
+        counter_fours = self.board.mask_positions(self.board.threat_mask(defender, 2))
+        replies += [move for move in counter_fours if move not in replies]
+        
+        main_line = None
+        for reply_row, reply_col in replies:
+            if defender == Stone.BLACK and self.rule_engine.is_forbidden_move(reply_row, reply_col, defender):
+                continue
+            
+            self.board.make_move(reply_row, reply_col, defender)
+            
+            # A reply that neither blocks the three nor makes a four loses at once
+            if not self.five_points(defender) and self.open_four_points(attacker):
+                self.board.unmake_move(reply_row, reply_col)
+                continue
+            
+            line = self._attack(attacker, defender, depth - 1)
+            self.board.unmake_move(reply_row, reply_col)
+            
+            if line is None:
+                return None
+            if main_line is None:
+                main_line = [(reply_row, reply_col)] + line
+        
+        # Every reply loses at once: the three is as good as an open four
+        return main_line if main_line is not None else []
+    
+    def open_four_points(self, stone: Stone) -> List[Tuple[int, int]]:
+        """Empty cells where the stone would legally make an open four."""
+        points = self.board.mask_positions(self.board.open_four_mask(stone))
+        if stone != Stone.BLACK:
+            return points
+        return [(row, col) for row, col in points
+                if not self.rule_engine.is_forbidden_move(row, col, stone)]
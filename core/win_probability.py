@@ -0,0 +1,176 @@
+"""
+Calibrated win probability.
+
+A position's win probability for the side to move is a logistic function
+of a score, with one set of parameters for search scores and one for
+static evaluations:
+    
+    p = 1 / (1 + exp(-(slope * score + intercept + black * [black to move])))
+
+The parameters are fitted to self-play outcomes by
+tools/fit_win_probability.py and read from a JSON file; without one, the
+evaluator's uncalibrated sigmoid is used.
+
+The latest search score of each position is cached by Zobrist key, so
+showing the probability after a move costs no evaluation: the search that
+chose the move already scored the position it leads to.
+"""
+
+import json
+import math
+import os
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from .board import Board, Stone
+from .evaluator import PositionEvaluator
+from .analysis_store import AnalysisStore
+from .pns import ProofNumberSearch
+
+
+MODEL_VERSION = 1
+
+
+class LogisticFit:
+    """Logistic mapping from a score for the side to move to its win probability."""
+    
+    def __init__(self, slope: float, intercept: float = 0.0, black: float = 0.0):
+        self.slope = slope          # Per point of score
+        self.intercept = intercept
+        self.black = black          # Added when black is to move
+    
+    def probability(self, score: float, stone: Stone) -> float:
+        """Win probability of stone, to move, given its score."""
+        # Decided positions are certain however the fit turned out
+        if score >= PositionEvaluator.FIVE:
+            return 1.0
+        if score <= -PositionEvaluator.FIVE:
+            return 0.0
+        x = self.slope * score + self.intercept
+        if stone == Stone.BLACK:
+            x += self.black
+        
+        # Clamp to avoid overflow
+        x = max(-30.0, min(30.0, x))
+        return 1.0 / (1.0 + math.exp(-x))
+    
+    def to_dict(self) -> Dict[str, float]:
+        return {'slope': self.slope, 'intercept': self.intercept, 'black': self.black}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, float]) -> 'LogisticFit':
+        return cls(float(data['slope']), float(data.get('intercept', 0.0)),
+                   float(data.get('black', 0.0)))
+    
+    def __repr__(self) -> str:
+        return f"LogisticFit(slope={self.slope:.6g}, intercept={self.intercept:.4f}, black={self.black:.4f})"
+
+
+class WinProbabilityModel:
+    """Win probability of positions from cached search scores, stored analysis or static evaluation."""
+    
+    def __init__(self, search: Optional[LogisticFit] = None, static: Optional[LogisticFit] = None,
+                 store: Optional[AnalysisStore] = None, cache_size: int = 4096):
+        """Unfitted parameters default to the evaluator's sigmoid."""
+        default_slope = 1.0 / PositionEvaluator.WIN_PROBABILITY_SCALE
+        self.search = search or LogisticFit(default_slope)
+        self.static = static or LogisticFit(default_slope)
+        self.store = store
+        self.cache_size = cache_size
+        
+        # (Zobrist key, stone to move) -> latest search score, least recently used first
+        self._cache: 'OrderedDict[Tuple[int, Stone], int]' = OrderedDict()
+    
+    @staticmethod
+    def default_path() -> str:
+        """OMOK_LAB_WIN_MODEL, or data/win_probability.json next to the package."""
+        path = os.environ.get('OMOK_LAB_WIN_MODEL')
+        if not path:
+            root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            path = os.path.join(root, 'data', 'win_probability.json')
+        return path
+    
+    @classmethod
+    def load(cls, path: str, store: Optional[AnalysisStore] = None) -> 'WinProbabilityModel':
+        """Read fitted parameters written by save()."""
+        with open(path) as f:
+            data = json.load(f)
+        if data.get('version') != MODEL_VERSION:
+            raise ValueError(f"{path} is not a version {MODEL_VERSION} win probability model")
+        return cls(LogisticFit.from_dict(data['search']), LogisticFit.from_dict(data['static']), store)
+    
+    @classmethod
+    def open_default(cls, store: Optional[AnalysisStore] = None) -> 'WinProbabilityModel':
+        """The fitted model at default_path(), or the default parameters if there is none."""
+        try:
+            return cls.load(cls.default_path(), store)
+        except (OSError, ValueError, KeyError, TypeError):
+            return cls(store=store)
+    
+    def save(self, path: str, **info):
+        """Write the parameters, with any extra information about the fit, as JSON."""
+        data = {'version': MODEL_VERSION, 'search': self.search.to_dict(),
+                'static': self.static.to_dict()}
+        data.update(info)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+    
+    def record(self, board: Board, stone: Stone, score: int,
+               move: Optional[Tuple[int, int]] = None):
+        """
+        Remember a search score for the current position with stone to move.
+        With the move the search chose, the position after it is remembered
+        too, with the score negated for the opponent.
+        """
+        self._remember((board.zobrist_key, stone), score)
+        if move is not None:
+            opponent = Stone.WHITE if stone == Stone.BLACK else Stone.BLACK
+            self._remember((board.key_after(move[0], move[1], stone), opponent), -score)
+    
+    def _remember(self, key: Tuple[int, Stone], score: int):
+        self._cache[key] = score
+        self._cache.move_to_end(key)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
+    def clear(self):
+        """Forget every cached score."""
+        self._cache.clear()
+    
+    def probability(self, board: Board, evaluator: Optional[PositionEvaluator] = None) -> Tuple[float, str]:
+        """
+        Black's win probability in the current position and where it came
+        from: 'result', 'search', 'store', 'static' or 'default'. The static evaluation
+        is used only when no search result is known; pass an incremental
+        evaluator to keep it cheap.
+        """
+        stone = board.current_player
+        mover_probability, source = self._mover_probability(board, stone, evaluator)
+        if stone == Stone.BLACK:
+            return mover_probability, source
+        return 1.0 - mover_probability, source
+    
+    def _mover_probability(self, board: Board, stone: Stone,
+                           evaluator: Optional[PositionEvaluator]) -> Tuple[float, str]:
+        """Win probability of stone, to move."""
+        if board.game_over:
+            if board.winner is None:
+                return 0.5, 'result'
+            return float(board.winner == stone), 'result'
+        
+        score = self._cache.get((board.zobrist_key, stone))
+        if score is not None:
+            return self.search.probability(score, stone), 'search'
+        
+        if self.store is not None:
+            entry = self.store.lookup(board, stone)
+            if entry is not None:
+                if entry.solver == ProofNumberSearch.WIN:
+                    return 1.0, 'store'
+                if entry.solver == ProofNumberSearch.LOSS:
+                    return 0.0, 'store'
+                return self.search.probability(entry.score, stone), 'store'
+        
+        if evaluator is not None:
+            return self.static.probability(evaluator.evaluate(stone), stone), 'static'
+        return 0.5, 'default'
@@ -3,15 +3,24 @@ Omok-Lab: AI-Powered Gomoku Analysis Tool
 Main entry point for the application.
 """
 
+import argparse
 import sys
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtGui import QFont
 from ui.main_window import MainWindow
+from core import profiling
 
 
 def main():
     """Main application entry point."""
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Omok-Lab")
+    parser.add_argument('--profile', nargs='?', const='', metavar='DIR',
+                        help="time the engine's entry points; with DIR, also dump a cProfile per move there")
+    args, qt_args = parser.parse_known_args()
+    if args.profile is not None:
+        profiling.enable_for_children(args.profile or None)
+    
+    app = QApplication(sys.argv[:1] + qt_args)
     
     # Set application metadata
     app.setApplicationName("Omok-Lab")
@@ -0,0 +1,19 @@
+"""Tests for the serial search."""
+
+import math
+from core.board import Board, Stone
+from core.minimax import MinimaxAI
+
+
+def test_node_with_every_candidate_forbidden_has_finite_score():
+    """A black node whose candidates are all forbidden is scored, not left at -inf."""
+    board = Board()
+    for row, col in [(7, 7), (7, 8), (8, 8)]:
+        board.place_stone(row, col, board.current_player)
+    ai = MinimaxAI(board, max_depth=2, time_limit=60.0, use_vcf=False, use_vct=False)
+    ai.rule_engine.is_forbidden_move = lambda row, col, stone: stone == Stone.BLACK
+    
+    move = ai.get_best_move(Stone.WHITE)
+    
+    assert move is not None
+    assert math.isfinite(move[2])
@@ -0,0 +1,55 @@
+"""Tests for the root-parallel search."""
+
+import threading
+import time
+from core.board import Board
+from core.parallel import ParallelMinimaxAI
+
+
+def make_board(moves) -> Board:
+    """A board with the moves played in turn."""
+    board = Board()
+    for row, col in moves:
+        board.place_stone(row, col, board.current_player)
+    return board
+
+
+def make_ai(board: Board) -> ParallelMinimaxAI:
+    """Two-worker engine searching to a fixed depth."""
+    return ParallelMinimaxAI(board, max_depth=3, time_limit=60.0, use_vcf=False, use_vct=False, workers=2)
+
+
+def test_cutoffs_by_source_add_up_to_cutoffs():
+    """Worker cutoffs are credited to their ordering source in the parent's statistics."""
+    board = make_board([(7, 7), (7, 8), (8, 8), (6, 6), (8, 7)])
+    ai = make_ai(board)
+    
+    move, stats = ai.get_best_move(board.current_player, with_stats=True)
+    
+    assert move is not None
+    assert stats.cutoffs > 0
+    assert sum(stats.cutoffs_by_source.values()) == stats.cutoffs
+    assert ai.cutoff_stats()['cutoffs'] == stats.cutoffs
+
+
+def test_searches_sharing_a_pool_keep_their_own_deadlines():
+    """A short search on the same pool does not cut a long one short."""
+    board = make_board([(7, 7), (7, 8), (8, 8), (6, 6), (8, 7)])
+    expected = make_ai(board).get_best_move(board.current_player)
+    
+    long_search = make_ai(board)
+    quick_board = make_board([(7, 7), (0, 0), (7, 8), (0, 14), (7, 9), (14, 0)])
+    quick_search = make_ai(quick_board)
+    quick_search.time_limit = 0.01
+    assert long_search.slot != quick_search.slot
+    
+    results = []
+    thread = threading.Thread(target=lambda: results.append(long_search.get_best_move(board.current_player)))
+    thread.start()
+    while thread.is_alive():
+        quick_search.get_best_move(quick_board.current_player)
+        time.sleep(0.02)
+    thread.join()
+    
+    assert results == [expected]
+    assert long_search.completed_depth == 3
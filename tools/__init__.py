@@ -0,0 +1,4 @@
+"""
+Headless developer tools for Omok-Lab.
+Run from the repository root, e.g. python -m tools.arena --help.
+"""
@@ -0,0 +1,134 @@
+"""
+Post-game analysis with the proof-number solver.
+
+Solves the positions of a finished game from the last move backwards,
+so later positions' proofs are reused by earlier ones, and reports where
+a forced win appeared or was let slip. Proven wins and losses are saved
+in the analysis store, where the engine and the GUI pick them up.
+
+The game is given as moves, or as one record of an arena output file:
+    
+    python -m tools.analyze_game H8 H9 J8 J9 K8 L8 J7 G9
+    python -m tools.analyze_game --arena games.jsonl --game 3 --time 10
+
+With --table, the proof tables are loaded before and saved after, so an
+interrupted analysis can be resumed.
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import List, Optional, Tuple
+from core.board import Board, Move, Stone
+from core.evaluator import PositionEvaluator
+from core.analysis_store import AnalysisStore
+from core.pns import ProofNumberSearch, ProofResult
+
+
+def read_arena_game(path: str, index: int) -> List[str]:
+    """Moves of one game record written by tools.arena --output."""
+    with open(path) as f:
+        records = [line for line in f if line.strip()]
+    if not 0 <= index < len(records):
+        raise ValueError(f"{path} has {len(records)} games, no game {index}")
+    return json.loads(records[index])['moves']
+
+
+def replay(moves: List[str]) -> Board:
+    """A board with the game's moves played."""
+    board = Board()
+    for coord in moves:
+        row, col = Move.from_coordinate(coord)
+        if not board.place_stone(row, col, board.current_player):
+            raise ValueError(f"illegal move {coord}")
+    return board
+
+
+def analyze(board: Board, solver: ProofNumberSearch, store: Optional[AnalysisStore],
+            first: int) -> List[Tuple[int, Stone, ProofResult]]:
+    """
+    Solve the positions after move first onwards, last position first, and
+    take the game's moves back while doing so. Returns (moves played, side
+    to move, result) per position, in game order.
+    """
+    results = []
+    while len(board.move_history) >= first:
+        if not board.game_over:
+            stone = board.current_player
+            result = solver.solve(stone)
+            results.append((len(board.move_history), stone, result))
+            if store is not None:
+                record(store, board, stone, result)
+        if not board.move_history:
+            break
+        board.undo_move()
+    results.reverse()
+    return results
+
+
+def record(store: AnalysisStore, board: Board, stone: Stone, result: ProofResult):
+    """Save a proven result in the analysis store."""
+    if result.result == ProofNumberSearch.WIN:
+        store.record(board, stone, 0, PositionEvaluator.FIVE, result.best_move, ProofNumberSearch.WIN)
+    elif result.result == ProofNumberSearch.LOSS:
+        store.record(board, stone, 0, -PositionEvaluator.FIVE, None, ProofNumberSearch.LOSS)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Find forced wins in a finished game.")
+    parser.add_argument('moves', nargs='*', help="the game's moves, e.g. H8 H9 J8")
+    parser.add_argument('--arena', help="read the game from a tools.arena --output file")
+    parser.add_argument('--game', type=int, default=0, help="index of the game in the arena file")
+    parser.add_argument('--from-move', type=int, default=0,
+                        help="analyse only the positions after this many moves")
+    parser.add_argument('--time', type=float, default=5.0, help="seconds per position")
+    parser.add_argument('--nodes', type=int, default=200000, help="nodes per position")
+    parser.add_argument('--table', help="proof table file to resume from and save to")
+    parser.add_argument('--store', help="analysis store to write to (default: the GUI's)")
+    parser.add_argument('--no-store', action='store_true', help="do not write to an analysis store")
+    args = parser.parse_args(argv)
+    
+    if args.arena:
+        moves = read_arena_game(args.arena, args.game)
+    elif args.moves:
+        moves = args.moves
+    else:
+        parser.error("give the moves or --arena")
+    board = replay(moves)
+    
+    solver = ProofNumberSearch(board, node_limit=args.nodes, time_limit=args.time)
+    if args.table and os.path.exists(args.table):
+        solver.load(args.table)
+    store = None
+    if not args.no_store:
+        store = AnalysisStore(args.store) if args.store else AnalysisStore.open_default()
+    
+    try:
+        results = analyze(board, solver, store, args.from_move)
+    finally:
+        if args.table:
+            solver.save(args.table)
+        if store is not None:
+            store.close()
+    
+    # The game's moves against the proven outcomes; a win for the side to
+    # move followed by a win for the opponent was thrown away
+    previous = None
+    for played, stone, result in results:
+        line = f"{played:>3} {stone.name:<5} to move: {result.result:<7}"
+        if result.best_move is not None:
+            line += f" {Move(*result.best_move, stone, 0).to_coordinate():<4}"
+        line += f" ({result.nodes} nodes, {result.elapsed:.1f}s)"
+        if played < len(moves):
+            line += f"  played {moves[played]}"
+        if previous == (played - 1, ProofNumberSearch.WIN) and result.result == ProofNumberSearch.WIN:
+            line += "  <- forced win let slip"
+        print(line)
+        previous = (played, result.result)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,361 @@
+"""
+Headless engine-vs-engine arena.
+
+Plays games between two engines in worker processes, starting from the
+26 standard Renju openings (or openings read from a file) with each
+opening played once with either colour. Moves are checked with
+RenjuRuleEngine, and a move that is forbidden, illegal or over the time
+limit loses the game. Results are printed as games finish, followed by
+the Elo difference, an SPRT verdict, nodes per second and move latency
+percentiles for each engine.
+
+Engines are given as module:Class with optional keyword arguments,
+for example:
+    
+    python -m tools.arena --games 200 --time 1.0 \\
+        --engine-a core.minimax:MinimaxAI,use_vct=False \\
+        --engine-b core.minimax:MinimaxAI
+"""
+
+import argparse
+import ast
+import importlib
+import json
+import math
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+from core.board import Board, Move, Stone
+from core.rule_engine import RenjuRuleEngine
+from core import profiling
+
+
+DEFAULT_ENGINE = 'core.minimax:MinimaxAI'
+
+# Reasons a game can end
+FIVE = 'five'
+FORBIDDEN = 'forbidden'
+ILLEGAL = 'illegal'
+TIMEOUT = 'time'
+NO_MOVE = 'no move'
+FULL = 'full board'
+MOVE_LIMIT = 'move limit'
+
+
+def standard_openings() -> List[List[Tuple[int, int]]]:
+    """
+    The 26 Renju openings: black in the centre, white on a direct or
+    diagonal neighbour, and black's second stone anywhere in the central
+    5x5 square, one representative per symmetry class.
+    """
+    center = Board.SIZE // 2
+    openings = []
+    seen = set()
+    for second in ((center + 1, center), (center + 1, center + 1)):
+        for row in range(center - 2, center + 3):
+            for col in range(center - 2, center + 3):
+                if (row, col) in ((center, center), second):
+                    continue
+                board = Board()
+                moves = [(center, center), second, (row, col)]
+                for (r, c), stone in zip(moves, (Stone.BLACK, Stone.WHITE, Stone.BLACK)):
+                    board.make_move(r, c, stone)
+                key = board.canonical_key()[0]
+                if key not in seen:
+                    seen.add(key)
+                    openings.append(moves)
+    return openings
+
+
+def read_openings(path: str) -> List[List[Tuple[int, int]]]:
+    """Read openings written one per line as coordinates, e.g. 'H8 H9 J10'."""
+    openings = []
+    with open(path) as f:
+        for line in f:
+            line = line.split('#')[0].strip()
+            if line:
+                openings.append([Move.from_coordinate(coord) for coord in line.split()])
+    return openings
+
+
+def parse_engine(spec: str) -> Tuple[str, Dict[str, object]]:
+    """Split 'module:Class,key=value,...' into the class path and keyword arguments."""
+    path, *options = spec.split(',')
+    if ':' not in path:
+        raise ValueError(f"engine must be given as module:Class, got {path!r}")
+    
+    kwargs = {}
+    for option in options:
+        name, _, value = option.partition('=')
+        try:
+            kwargs[name.strip()] = ast.literal_eval(value.strip())
+        except (ValueError, SyntaxError):
+            kwargs[name.strip()] = value.strip()
+    return path, kwargs
+
+
+def create_engine(spec: str, board: Board, time_limit: float, max_depth: int):
+    """Build an engine on the given board from its spec."""
+    path, kwargs = parse_engine(spec)
+    module_name, class_name = path.split(':')
+    engine_class = getattr(importlib.import_module(module_name), class_name)
+    kwargs.setdefault('max_depth', max_depth)
+    kwargs.setdefault('time_limit', time_limit)
+    return engine_class(board, **kwargs)
+
+
+def play_game(specs: Tuple[str, str], opening: List[Tuple[int, int]], a_is_black: bool,
+              time_limit: float, time_margin: float, max_depth: int, max_moves: int) -> dict:
+    """
+    Play one game in a worker process. Each engine searches on its own
+    board; the referee board and rule engine decide legality and the result.
+    Returns a JSON-friendly record of the game.
+    """
+    referee = Board()
+    rules = RenjuRuleEngine(referee)
+    boards = [Board(), Board()]
+    engines = [create_engine(spec, board, time_limit, max_depth)
+               for spec, board in zip(specs, boards)]
+    
+    # engine index playing each colour
+    players = {Stone.BLACK: 0 if a_is_black else 1, Stone.WHITE: 1 if a_is_black else 0}
+    stats = [{'nodes': 0, 'search_time': 0.0, 'latencies': []} for _ in engines]
+    
+    # Each searched move's score for its mover (None for book moves), for calibration
+    scores: List[Optional[int]] = []
+    
+    def play(row: int, col: int, stone: Stone):
+        referee.place_stone(row, col, stone)
+        for board in boards:
+            board.place_stone(row, col, stone)
+    
+    stone = Stone.BLACK
+    for row, col in opening:
+        play(row, col, stone)
+        stone = referee.current_player
+    
+    winner: Optional[Stone] = None
+    reason = FULL
+    while not referee.game_over:
+        if len(referee.move_history) >= max_moves:
+            reason = MOVE_LIMIT
+            break
+        if not referee.get_empty_positions():
+            reason = FULL
+            break
+        
+        index = players[stone]
+        engine = engines[index]
+        start = time.perf_counter()
+        result = engine.get_best_move(stone)
+        elapsed = time.perf_counter() - start
+        stats[index]['nodes'] += engine.nodes_evaluated
+        stats[index]['search_time'] += elapsed
+        stats[index]['latencies'].append(elapsed)
+        
+        opponent = Stone.WHITE if stone == Stone.BLACK else Stone.BLACK
+        if result is None:
+            winner, reason = opponent, NO_MOVE
+            break
+        row, col = result[0], result[1]
+        if not referee.is_valid_position(row, col) or not referee.is_empty(row, col):
+            winner, reason = opponent, ILLEGAL
+            break
+        if stone == Stone.BLACK and rules.is_forbidden_move(row, col, stone):
+            winner, reason = opponent, FORBIDDEN
+            break
+        if elapsed > time_limit + time_margin:
+            winner, reason = opponent, TIMEOUT
+            break
+        
+        play(row, col, stone)
+        scores.append(int(result[2]) if getattr(engine, 'source', 'search') != 'book' else None)
+        if referee.game_over:
+            winner, reason = referee.winner, FIVE
+        stone = opponent
+    
+    # Score from engine A's side
+    if winner is None:
+        score = 0.5
+    else:
+        score = 1.0 if players[winner] == 0 else 0.0
+    
+    return {
+        'opening': ' '.join(Move(r, c, Stone.EMPTY, 0).to_coordinate() for r, c in opening),
+        'a_is_black': a_is_black,
+        'score': score,
+        'reason': reason,
+        'moves': [move.to_coordinate() for move in referee.move_history],
+        'scores': scores,
+        'stats': stats,
+    }
+
+
+def elo_difference(wins: int, draws: int, losses: int) -> Tuple[float, float]:
+    """Elo difference of engine A over B and the half-width of its 95% interval."""
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0, float('inf')
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    
+    def elo(s: float) -> float:
+        s = min(max(s, 1e-6), 1 - 1e-6)
+        return -400 * math.log10(1 / s - 1)
+    
+    margin = 1.96 * math.sqrt(variance / games)
+    return elo(score), (elo(score + margin) - elo(score - margin)) / 2
+
+
+def sprt_llr(wins: int, draws: int, losses: int, elo0: float, elo1: float) -> float:
+    """
+    Log-likelihood ratio of H1 (elo = elo1) against H0 (elo = elo0), using the
+    normal approximation to the trinomial game outcome.
+    """
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0
+    score = (wins + draws / 2) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    if variance == 0:
+        return 0.0
+    
+    s0 = 1 / (1 + 10 ** (-elo0 / 400))
+    s1 = 1 / (1 + 10 ** (-elo1 / 400))
+    return games * (s1 - s0) * (2 * score - s0 - s1) / (2 * variance)
+
+
+def sprt_bounds(alpha: float, beta: float) -> Tuple[float, float]:
+    """Lower (accept H0) and upper (accept H1) LLR bounds."""
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize_engine(stats: List[dict]) -> dict:
+    """Combine per-game stats of one engine."""
+    nodes = sum(s['nodes'] for s in stats)
+    search_time = sum(s['search_time'] for s in stats)
+    latencies = [latency for s in stats for latency in s['latencies']]
+    return {
+        'moves': len(latencies),
+        'nodes_per_second': nodes / search_time if search_time else 0.0,
+        'latency_p50': percentile(latencies, 0.5),
+        'latency_p90': percentile(latencies, 0.9),
+        'latency_p99': percentile(latencies, 0.99),
+        'latency_max': max(latencies, default=0.0),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Play engine-vs-engine games headlessly.")
+    parser.add_argument('--engine-a', default=DEFAULT_ENGINE, help="candidate engine, module:Class[,key=value...]")
+    parser.add_argument('--engine-b', default=DEFAULT_ENGINE, help="baseline engine")
+    parser.add_argument('--games', type=int, default=52, help="games to play (rounded up to pairs)")
+    parser.add_argument('--time', type=float, default=1.0, help="time limit per move in seconds")
+    parser.add_argument('--time-margin', type=float, default=0.5,
+                        help="seconds over the limit allowed before a move loses on time")
+    parser.add_argument('--depth', type=int, default=10, help="maximum search depth")
+    parser.add_argument('--max-moves', type=int, default=Board.SIZE * Board.SIZE,
+                        help="moves after which the game is drawn")
+    parser.add_argument('--openings', help="file with one opening per line, e.g. 'H8 H9 J10'")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count(),
+                        help="games played at once")
+    parser.add_argument('--elo0', type=float, default=0.0, help="SPRT null hypothesis")
+    parser.add_argument('--elo1', type=float, default=10.0, help="SPRT alternative hypothesis")
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--beta', type=float, default=0.05)
+    parser.add_argument('--no-stop', action='store_true',
+                        help="play every game even once the SPRT has decided")
+    parser.add_argument('--output', help="write one JSON record per game to this file")
+    parser.add_argument('--profile', nargs='?', const='', metavar='DIR',
+                        help="time the engine's entry points; with DIR, also dump a cProfile per move there")
+    args = parser.parse_args(argv)
+    if args.profile is not None:
+        profiling.enable_for_children(args.profile or None)
+    
+    for spec in (args.engine_a, args.engine_b):
+        parse_engine(spec)
+    openings = read_openings(args.openings) if args.openings else standard_openings()
+    if not openings:
+        parser.error("no openings")
+    
+    # Each opening is played with both colour assignments, back to back
+    pairs = (args.games + 1) // 2
+    schedule = [(openings[i % len(openings)], a_is_black)
+                for i in range(pairs) for a_is_black in (True, False)]
+    
+    lower, upper = sprt_bounds(args.alpha, args.beta)
+    specs = (args.engine_a, args.engine_b)
+    wins = draws = losses = 0
+    engine_stats: Tuple[List[dict], List[dict]] = ([], [])
+    verdict = None
+    output = open(args.output, 'w') if args.output else None
+    
+    context = multiprocessing.get_context('spawn')
+    workers = max(1, min(args.workers, len(schedule)))
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [pool.submit(play_game, specs, opening, a_is_black, args.time,
+                               args.time_margin, args.depth, args.max_moves)
+                   for opening, a_is_black in schedule]
+        
+        for number, future in enumerate(as_completed(futures), 1):
+            game = future.result()
+            if game['score'] == 1.0:
+                wins += 1
+            elif game['score'] == 0.0:
+                losses += 1
+            else:
+                draws += 1
+            engine_stats[0].append(game['stats'][0])
+            engine_stats[1].append(game['stats'][1])
+            if output is not None:
+                output.write(json.dumps(game) + '\n')
+                output.flush()
+            
+            elo, margin = elo_difference(wins, draws, losses)
+            llr = sprt_llr(wins, draws, losses, args.elo0, args.elo1)
+            colour = 'black' if game['a_is_black'] else 'white'
+            print(f"game {number:4d}  {game['opening']:<12} A as {colour}: {game['score']:.1f} "
+                  f"({game['reason']}, {len(game['moves'])} moves)  "
+                  f"+{wins} ={draws} -{losses}  elo {elo:+.1f} ±{margin:.1f}  "
+                  f"llr {llr:+.2f} [{lower:.2f}, {upper:.2f}]", flush=True)
+            
+            if llr >= upper:
+                verdict = 'H1 accepted'
+            elif llr <= lower:
+                verdict = 'H0 accepted'
+            if verdict is not None and not args.no_stop:
+                for pending in futures:
+                    pending.cancel()
+                break
+    
+    if output is not None:
+        output.close()
+    
+    elo, margin = elo_difference(wins, draws, losses)
+    print()
+    print(f"A: {args.engine_a}")
+    print(f"B: {args.engine_b}")
+    print(f"games {wins + draws + losses}: +{wins} ={draws} -{losses}, elo {elo:+.1f} ±{margin:.1f}")
+    print(f"SPRT elo0={args.elo0} elo1={args.elo1}: {verdict or 'inconclusive'}")
+    for name, stats in zip('AB', engine_stats):
+        summary = summarize_engine(stats)
+        print(f"{name}: {summary['nodes_per_second']:.0f} nodes/s over {summary['moves']} moves, "
+              f"latency p50 {summary['latency_p50']:.3f}s p90 {summary['latency_p90']:.3f}s "
+              f"p99 {summary['latency_p99']:.3f}s max {summary['latency_max']:.3f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
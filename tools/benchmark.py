@@ -0,0 +1,279 @@
+"""
+Microbenchmarks for the engine's hot paths.
+
+Every benchmark runs on a fixed corpus of early, middle and late game
+positions. Operation benchmarks report operations per second (best of
+several timed rounds); search benchmarks run get_best_move to a fixed
+depth from a cold engine and report nodes per second and the time taken
+to complete each depth.
+
+Results are written as JSON. Given a baseline file written earlier, every
+metric is compared against it and the run fails if one got worse by more
+than the threshold:
+    
+    python -m tools.benchmark --output baseline.json
+    python -m tools.benchmark --baseline baseline.json --threshold 0.1
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from core.board import Board, Move, Stone
+from core.evaluator import PositionEvaluator
+from core.minimax import MinimaxAI
+from core.rule_engine import RenjuRuleEngine
+from core import profiling
+
+
+FORMAT_VERSION = 1
+
+# Fixed positions, as move sequences from an empty board
+CORPUS = {
+    'early': 'H8 H9 J8 J9 K8 L8 J7 G9',
+    'mid': 'H8 H9 G7 G9 F6 E5 F7 J9 E7 D7 F8 K9 F9 F5 L9 F10 E9 E6 H7 J7 D8 J8',
+    'late': ('H8 H9 G7 J8 G8 G10 G6 G9 F6 K7 L6 J9 F11 K9 F9 K8 L9 K6 K5 J10 K10 J11 '
+             'J7 H11 J12 G12 L8 G11 F13 K11 L11 L7 H10 L12 G13 M8 M13 M6 N5 L10 F12 F10 H7 J6'),
+}
+
+# Metrics where a smaller value is better; everything else is a rate
+LOWER_IS_BETTER = ('seconds', 'time_to_depth')
+
+
+def load_position(name: str) -> Board:
+    """A fresh board holding one corpus position."""
+    board = Board()
+    for coord in CORPUS[name].split():
+        row, col = Move.from_coordinate(coord)
+        board.place_stone(row, col, board.current_player)
+    return board
+
+
+def measure(operation: Callable[[], int], min_time: float, rounds: int) -> float:
+    """
+    Operations per second of a callable that performs some number of
+    operations and returns that number. Each round repeats the callable for
+    at least min_time; the best round counts, as slower rounds only add noise.
+    """
+    best = 0.0
+    for _ in range(rounds):
+        count = 0
+        start = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < min_time:
+            count += operation()
+            elapsed = time.perf_counter() - start
+        best = max(best, count / elapsed)
+    return best
+
+
+def bench_board(board: Board) -> Dict[str, Callable[[], int]]:
+    """place_stone/undo_move pairs over the empty cells, and _check_win over the stones."""
+    empty = board.get_empty_positions()
+    stones = [(move.row, move.col, move.stone) for move in board.move_history]
+    player = board.current_player
+    
+    def place_undo() -> int:
+        for row, col in empty:
+            board.place_stone(row, col, player)
+            board.undo_move()
+        return len(empty)
+    
+    def check_win() -> int:
+        for row, col, stone in stones:
+            board._check_win(row, col, stone)
+        return len(stones)
+    
+    return {'board.place_stone+undo_move': place_undo, 'board._check_win': check_win}
+
+
+def bench_evaluator(board: Board) -> Dict[str, Callable[[], int]]:
+    """Full-scan and incremental evaluate()."""
+    full = PositionEvaluator(board)
+    incremental = PositionEvaluator(board, incremental=True)
+    
+    def evaluate_full() -> int:
+        full.evaluate(Stone.BLACK)
+        return 1
+    
+    def evaluate_incremental() -> int:
+        incremental.evaluate(Stone.BLACK)
+        return 1
+    
+    return {'evaluator.evaluate': evaluate_full,
+            'evaluator.evaluate[incremental]': evaluate_incremental}
+
+
+def bench_rules(board: Board) -> Dict[str, Callable[[], int]]:
+    """Forbidden-move checks without the incremental cache."""
+    rules = RenjuRuleEngine(board)
+    candidates = board.get_candidate_positions()
+    
+    def is_forbidden() -> int:
+        for row, col in candidates:
+            rules.is_forbidden_move(row, col, Stone.BLACK)
+        return len(candidates)
+    
+    def all_forbidden() -> int:
+        rules.get_all_forbidden_positions(Stone.BLACK)
+        return 1
+    
+    return {'rules.is_forbidden_move': is_forbidden,
+            'rules.get_all_forbidden_positions': all_forbidden}
+
+
+def bench_candidates(board: Board) -> Dict[str, Callable[[], int]]:
+    """Root move generation."""
+    ai = MinimaxAI(board, use_vcf=False, use_vct=False)
+    stone = board.current_player
+    
+    def candidate_moves() -> int:
+        ai._get_candidate_moves(stone)
+        return 1
+    
+    return {'minimax._get_candidate_moves': candidate_moves}
+
+
+def bench_search(name: str, depth: int, rounds: int) -> Dict[str, object]:
+    """get_best_move to a fixed depth from a cold engine; the fastest of several rounds counts."""
+    best = None
+    for _ in range(rounds):
+        board = load_position(name)
+        ai = MinimaxAI(board, max_depth=depth, time_limit=1e9, use_vcf=False, use_vct=False)
+        start = time.perf_counter()
+        move = ai.get_best_move(board.current_player)
+        elapsed = time.perf_counter() - start
+        if best is not None and elapsed >= best['seconds']:
+            continue
+        best = {
+            'move': Move(move[0], move[1], board.current_player, 0).to_coordinate() if move else None,
+            'seconds': elapsed,
+            'nodes': ai.nodes_evaluated,
+            'nodes_per_second': ai.nodes_evaluated / elapsed if elapsed else 0.0,
+            'time_to_depth': ai.iteration_times,
+            'nodes_per_depth': ai.iteration_nodes,
+        }
+    return best
+
+
+def run(depth: int, min_time: float, rounds: int, only: Optional[str] = None) -> Dict[str, dict]:
+    """Run every benchmark whose name contains only; returns name -> metrics."""
+    results = {}
+    for name in CORPUS:
+        # Each suite gets its own board so listeners from one do not slow another
+        operations = {}
+        for suite in (bench_board, bench_evaluator, bench_rules, bench_candidates):
+            operations.update(suite(load_position(name)))
+        
+        for operation_name, operation in operations.items():
+            key = f'{operation_name}/{name}'
+            if only and only not in key:
+                continue
+            results[key] = {'ops_per_second': measure(operation, min_time, rounds)}
+            print(f"{key:<48} {results[key]['ops_per_second']:>14,.0f} ops/s", flush=True)
+        
+        key = f'minimax.get_best_move[depth={depth}]/{name}'
+        if only and only not in key:
+            continue
+        results[key] = bench_search(name, depth, rounds)
+        times = ' '.join(f'{t:.3f}' for t in results[key]['time_to_depth'])
+        print(f"{key:<48} {results[key]['nodes_per_second']:>14,.0f} nodes/s  "
+              f"{results[key]['nodes']} nodes  depths at {times}s", flush=True)
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict],
+            threshold: float) -> List[Tuple[str, str, float, float, float]]:
+    """
+    Metrics that got worse than the baseline by more than threshold, as
+    (benchmark, metric, baseline value, new value, relative change).
+    Rates must not drop, times must not grow; lists are compared element-wise.
+    """
+    regressions = []
+    for key, metrics in results.items():
+        old_metrics = baseline.get(key)
+        if old_metrics is None:
+            continue
+        for metric, value in metrics.items():
+            if metric in ('nodes', 'nodes_per_depth'):
+                continue  # Search shape, not speed
+            old = old_metrics.get(metric)
+            if isinstance(value, list) and isinstance(old, list):
+                pairs = [(f'{metric}[{i}]', o, v) for i, (o, v) in enumerate(zip(old, value))]
+            elif isinstance(value, (int, float)) and isinstance(old, (int, float)):
+                pairs = [(metric, old, value)]
+            else:
+                continue
+            
+            lower_is_better = metric in LOWER_IS_BETTER
+            for label, old_value, new_value in pairs:
+                if not old_value:
+                    continue
+                change = (new_value - old_value) / old_value
+                worse = change > threshold if lower_is_better else change < -threshold
+                if worse:
+                    regressions.append((key, label, old_value, new_value, change))
+    return regressions
+
+
+def git_revision() -> Optional[str]:
+    """Current commit of the repository, if git is available."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark the engine's hot paths.")
+    parser.add_argument('--depth', type=int, default=3, help="fixed depth of the search benchmarks")
+    parser.add_argument('--min-time', type=float, default=0.2, help="seconds per timed round")
+    parser.add_argument('--rounds', type=int, default=5, help="timed rounds per benchmark")
+    parser.add_argument('--only', help="run only benchmarks whose name contains this")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="compare against results written earlier")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="relative slowdown that counts as a regression")
+    parser.add_argument('--profile', nargs='?', const='', metavar='DIR',
+                        help="time the engine's entry points; with DIR, also dump a cProfile per move there")
+    args = parser.parse_args(argv)
+    if args.profile is not None:
+        profiling.enable_for_children(args.profile or None)
+    
+    results = run(args.depth, args.min_time, args.rounds, args.only)
+    report = {
+        'version': FORMAT_VERSION,
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('version') != FORMAT_VERSION:
+            print(f"{args.baseline}: unsupported format version", file=sys.stderr)
+            return 2
+        regressions = compare(results, baseline['results'], args.threshold)
+        print()
+        if not regressions:
+            print(f"No regressions against {args.baseline} (threshold {args.threshold:.0%})")
+            return 0
+        for key, metric, old, new, change in regressions:
+            print(f"REGRESSION {key} {metric}: {old:.4g} -> {new:.4g} ({change:+.1%})")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
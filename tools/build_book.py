@@ -0,0 +1,131 @@
+"""
+Build the opening book from self-play games.
+
+Reads game records written by the arena and adds the moves played in the
+first plies of every game to the book. A move is weighted by how it
+scored for the side that played it (two points for a win, one for a
+draw), and moves seen in too few games, or that never scored, are left
+out. Book scores are the mover's mean result mapped onto -1000..1000.
+    
+    python -m tools.arena --games 400 --time 1.0 --output games.jsonl
+    python -m tools.build_book games.jsonl
+
+The book is written where the engine looks for it (data/opening_book.bin,
+or --output); set OMOK_LAB_BOOK to use a book elsewhere.
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+from core.board import Board, Move, Stone
+from core.opening_book import OpeningBookBuilder
+from tools.arena import FIVE, FORBIDDEN, FULL, MOVE_LIMIT
+
+
+# Game endings that say something about the moves played
+USABLE_REASONS = (FIVE, FORBIDDEN, FULL, MOVE_LIMIT)
+
+# Book score of a move that always won
+SCORE_SCALE = 1000
+
+
+def default_path() -> str:
+    """data/opening_book.bin next to the package, where OpeningBook.open_default looks."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(root, 'data', 'opening_book.bin')
+
+
+def read_games(paths: List[str]) -> List[dict]:
+    """Game records from arena --output files."""
+    games = []
+    for path in paths:
+        with open(path) as f:
+            games.extend(json.loads(line) for line in f if line.strip())
+    return games
+
+
+def game_winner(game: dict) -> Optional[Stone]:
+    """Colour that won the game, None for a draw."""
+    if game['score'] == 0.5:
+        return None
+    a_won = game['score'] == 1.0
+    return Stone.BLACK if a_won == game['a_is_black'] else Stone.WHITE
+
+
+def book_moves(games: List[dict], plies: int):
+    """
+    Yield (board, row, col, points) for the first plies moves of every
+    usable game, with the board in the position before the move and points
+    the move's result for its side: 2 for a win, 1 for a draw, 0 for a loss.
+    """
+    for game in games:
+        if game.get('reason') not in USABLE_REASONS:
+            continue
+        winner = game_winner(game)
+        board = Board()
+        for coord in game['moves'][:plies]:
+            row, col = Move.from_coordinate(coord)
+            stone = board.current_player
+            points = 1 if winner is None else 2 * (winner == stone)
+            yield board, row, col, points
+            board.place_stone(row, col, stone)
+
+
+def build(games: List[dict], plies: int, min_games: int) -> OpeningBookBuilder:
+    """Tally every (position, move) over the games, then add the ones that qualify."""
+    # (canonical key, canonical cell) -> [points, games]
+    tallies: Dict[Tuple[int, int], List[int]] = {}
+    for board, row, col, points in book_moves(games, plies):
+        key, symmetry = board.canonical_key()
+        tally = tallies.setdefault((key, _canonical_cell(board, row, col, symmetry)), [0, 0])
+        tally[0] += points
+        tally[1] += 1
+    
+    builder = OpeningBookBuilder()
+    added = set()
+    for board, row, col, _ in book_moves(games, plies):
+        key, symmetry = board.canonical_key()
+        entry = (key, _canonical_cell(board, row, col, symmetry))
+        points, count = tallies[entry]
+        if entry in added or count < min_games or points == 0:
+            continue
+        added.add(entry)
+        score = round((points / count - 1) * SCORE_SCALE)
+        builder.add(board, row, col, weight=points, score=score)
+    return builder
+
+
+def _canonical_cell(board: Board, row: int, col: int, symmetry: int) -> int:
+    """Cell index of a move in the canonical orientation."""
+    canonical_row, canonical_col = board.to_canonical(row, col, symmetry)
+    return canonical_row * Board.SIZE + canonical_col
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Build the opening book from arena games.")
+    parser.add_argument('games', nargs='+', help="JSON lines files written by tools.arena --output")
+    parser.add_argument('--output', default=default_path(), help="where to write the book")
+    parser.add_argument('--plies', type=int, default=12, help="moves from the start of each game to add")
+    parser.add_argument('--min-games', type=int, default=2,
+                        help="games a move must appear in to enter the book")
+    args = parser.parse_args(argv)
+    
+    games = read_games(args.games)
+    builder = build(games, args.plies, args.min_games)
+    positions = len(builder.entries)
+    moves = sum(len(cells) for cells in builder.entries.values())
+    if not moves:
+        print("No moves qualified for the book", file=sys.stderr)
+        return 1
+    
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    builder.save(args.output)
+    print(f"Wrote {moves} moves in {positions} positions from {len(games)} games to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Fit the win probability model to self-play games.
+
+Reads game records written by the arena, replays every game and pairs
+each position with the final result for the side to move. Two logistic
+regressions are fitted: one on the search score each engine reported for
+the move it played, and one on the static evaluation of every position.
+Decisive scores (a five on the board or a proven win) and games lost by
+forfeit are left out.
+    
+    python -m tools.arena --games 400 --time 0.5 --output games.jsonl
+    python -m tools.fit_win_probability games.jsonl
+
+The parameters are written where the GUI looks for them
+(data/win_probability.json, or --output), followed by the log loss and a
+calibration table before and after fitting.
+"""
+
+import argparse
+import json
+import sys
+from typing import List, Optional, Tuple
+import numpy as np
+from core.board import Board, Move, Stone
+from core.evaluator import PositionEvaluator
+from core.win_probability import LogisticFit, WinProbabilityModel
+from tools.arena import FIVE, FORBIDDEN, FULL, MOVE_LIMIT
+
+
+# Game endings that say something about the positions played
+USABLE_REASONS = (FIVE, FORBIDDEN, FULL, MOVE_LIMIT)
+
+# Scores are divided by this while fitting, to keep the problem well conditioned
+SCORE_UNIT = 1000.0
+
+# Samples as (score for the side to move, black to move, result for the side to move)
+Samples = List[Tuple[float, bool, float]]
+
+
+def read_games(paths: List[str]) -> List[dict]:
+    """Game records from arena --output files."""
+    games = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    games.append(json.loads(line))
+    return games
+
+
+def game_winner(game: dict) -> Optional[Stone]:
+    """Colour that won the game, None for a draw."""
+    if game['score'] == 0.5:
+        return None
+    a_won = game['score'] == 1.0
+    return Stone.BLACK if a_won == game['a_is_black'] else Stone.WHITE
+
+
+def collect_samples(games: List[dict]) -> Tuple[Samples, Samples]:
+    """Search and static samples of every usable game."""
+    search: Samples = []
+    static: Samples = []
+    for game in games:
+        if game.get('reason') not in USABLE_REASONS:
+            continue
+        winner = game_winner(game)
+        moves = [Move.from_coordinate(coord) for coord in game['moves']]
+        scores = game.get('scores') or []
+        first_scored = len(moves) - len(scores)
+        
+        board = Board()
+        evaluator = PositionEvaluator(board, incremental=True)
+        for index, (row, col) in enumerate(moves):
+            stone = board.current_player
+            black = stone == Stone.BLACK
+            result = 0.5 if winner is None else float(winner == stone)
+            
+            score = evaluator.evaluate(stone)
+            if abs(score) < PositionEvaluator.FIVE:
+                static.append((score / SCORE_UNIT, black, result))
+            if index >= first_scored:
+                score = scores[index - first_scored]
+                if score is not None and abs(score) < PositionEvaluator.FIVE:
+                    search.append((score / SCORE_UNIT, black, result))
+            
+            board.place_stone(row, col, stone)
+        evaluator.detach()
+    return search, static
+
+
+def design(samples: Samples) -> Tuple[np.ndarray, np.ndarray]:
+    """Feature matrix (score, 1, black to move) and targets."""
+    data = np.array(samples, dtype=float).reshape(-1, 3)
+    features = np.column_stack([data[:, 0], np.ones(len(data)), data[:, 1]])
+    return features, data[:, 2]
+
+
+def fit_logistic(samples: Samples, ridge: float = 1e-3, iterations: int = 50) -> LogisticFit:
+    """
+    Logistic regression by Newton's method (iteratively reweighted least
+    squares). Draws count as half a win. A small ridge penalty keeps the
+    fit finite when the data separates perfectly.
+    """
+    features, targets = design(samples)
+    weights = np.zeros(features.shape[1])
+    for _ in range(iterations):
+        p = 1.0 / (1.0 + np.exp(-np.clip(features @ weights, -30, 30)))
+        gradient = features.T @ (p - targets) + ridge * weights
+        hessian = (features * (p * (1 - p))[:, None]).T @ features + ridge * np.eye(len(weights))
+        step = np.linalg.solve(hessian, gradient)
+        weights -= step
+        if np.max(np.abs(step)) < 1e-9:
+            break
+    return LogisticFit(weights[0] / SCORE_UNIT, weights[1], weights[2])
+
+
+def log_loss(fit: LogisticFit, samples: Samples) -> float:
+    """Mean cross-entropy of the fit's predictions."""
+    total = 0.0
+    for score, black, result in samples:
+        p = fit.probability(score * SCORE_UNIT, Stone.BLACK if black else Stone.WHITE)
+        p = min(max(p, 1e-9), 1 - 1e-9)
+        total -= result * np.log(p) + (1 - result) * np.log(1 - p)
+    return total / len(samples)
+
+
+def calibration(fit: LogisticFit, samples: Samples, bins: int = 10) -> List[Tuple[float, float, int]]:
+    """(mean predicted, mean observed, count) per probability bin."""
+    table = [[0.0, 0.0, 0] for _ in range(bins)]
+    for score, black, result in samples:
+        p = fit.probability(score * SCORE_UNIT, Stone.BLACK if black else Stone.WHITE)
+        entry = table[min(bins - 1, int(p * bins))]
+        entry[0] += p
+        entry[1] += result
+        entry[2] += 1
+    return [(predicted / count, observed / count, count)
+            for predicted, observed, count in table if count]
+
+
+def report(name: str, before: LogisticFit, after: LogisticFit, samples: Samples):
+    """Print the fit, its log loss against the old parameters and its calibration."""
+    print(f"{name}: {len(samples)} positions")
+    print(f"  {after}")
+    print(f"  log loss {log_loss(before, samples):.4f} -> {log_loss(after, samples):.4f}")
+    print(f"  {'predicted':>10} {'observed':>10} {'positions':>10}")
+    for predicted, observed, count in calibration(after, samples):
+        print(f"  {predicted:>10.3f} {observed:>10.3f} {count:>10}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Fit the win probability model to arena games.")
+    parser.add_argument('games', nargs='+', help="JSON lines files written by tools.arena --output")
+    parser.add_argument('--output', default=WinProbabilityModel.default_path(),
+                        help="where to write the fitted parameters")
+    parser.add_argument('--min-samples', type=int, default=200,
+                        help="fewest positions to fit a model on")
+    args = parser.parse_args(argv)
+    
+    games = read_games(args.games)
+    search, static = collect_samples(games)
+    if min(len(search), len(static)) < args.min_samples:
+        print(f"Too few positions to fit: {len(search)} searched, {len(static)} static "
+              f"(need {args.min_samples})", file=sys.stderr)
+        return 1
+    
+    old = WinProbabilityModel.open_default()
+    model = WinProbabilityModel(fit_logistic(search), fit_logistic(static))
+    report('search', old.search, model.search, search)
+    report('static', old.static, model.static, static)
+    
+    model.save(args.output, games=len(games), search_positions=len(search),
+               static_positions=len(static))
+    print(f"Wrote {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
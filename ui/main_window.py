@@ -5,34 +5,70 @@ Main window for Omok-Lab application.
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QHBoxLayout, QVBoxLayout,
                              QPushButton, QDialog, QLabel, QButtonGroup, QRadioButton,
                              QMessageBox, QToolBar, QStatusBar, QTableWidgetItem)
-from PyQt6.QtCore import Qt, QThread, pyqtSignal, QMargins
+from PyQt6.QtCore import Qt, QObject, pyqtSignal, QMargins
 from PyQt6.QtGui import QIcon, QAction, QFont
-from core.board import Board, Stone
+from core.board import Board, Stone, Move
 from core.rule_engine import RenjuRuleEngine
 from core.evaluator import PositionEvaluator
-from core.minimax import MinimaxAI
+from core.engine import EngineService, SearchJob, SolveJob
+from core.minimax import SearchStats
+from core.opening_book import OpeningBook
+from core.analysis_store import AnalysisStore
+from core.win_probability import WinProbabilityModel
+from core.pns import ProofNumberSearch
 from ui.board_widget import BoardWidget
 from ui.sidebar_widget import SidebarWidget
+from typing import Optional, Tuple
+import os
 import time
 
 
-class AIWorker(QThread):
-    """Worker thread for AI computation."""
+class AIWorker(QObject):
+    """Qt front end of the engine service; results arrive as a signal in the GUI thread."""
     
-    move_calculated = pyqtSignal(int, int, int)  # row, col, score
+    move_calculated = pyqtSignal(int, int, int, int)  # position id, row, col, score
+    search_finished = pyqtSignal(int, object)  # position id, SearchStats
+    threats_solved = pyqtSignal(int, object)  # position id, winning line or None
     
-    def __init__(self, board: Board, stone: Stone):
-        super().__init__()
-        self.board = board.copy()
-        self.stone = stone
-        self.ai = MinimaxAI(self.board, max_depth=3, time_limit=5.0)
+    def __init__(self, parent=None, book: Optional[OpeningBook] = None,
+                 store: Optional[AnalysisStore] = None):
+        super().__init__(parent)
+        
+        # Split the root moves across every core when there is more than one
+        self.engine = EngineService(max_depth=10, time_limit=5.0, book=book, store=store,
+                                    workers=os.cpu_count() or 1, on_result=self._on_result)
+    
+    def search(self, position_id: int, board: Board, stone: Stone,
+               ponder_move: Optional[Tuple[int, int]] = None) -> SearchJob:
+        """Start searching the position, superseding any earlier search."""
+        return self.engine.submit(SearchJob(position_id, board, stone, ponder_move))
+    
+    def solve(self, position_id: int, board: Board, stone: Stone) -> SolveJob:
+        """Look for a forced win for stone, superseding any search."""
+        return self.engine.submit(SolveJob(position_id, board, stone))
+    
+    def ponderhit(self, job: SearchJob, position_id: int):
+        """The pondered reply was played; the job now answers position_id."""
+        self.engine.ponderhit(job, position_id)
     
-    def run(self):
-        """Calculate the best move."""
-        result = self.ai.get_best_move(self.stone)
-        if result:
-            row, col, score = result
-            self.move_calculated.emit(row, col, score)
+    def cancel(self, job: Optional[SearchJob] = None):
+        """Cancel one search, or all of them."""
+        self.engine.cancel(job)
+    
+    def shutdown(self):
+        """Stop the engine thread."""
+        self.engine.shutdown()
+    
+    def _on_result(self, job: SearchJob):
+        """Called in the engine thread; the signals are queued to the GUI thread."""
+        if isinstance(job, SolveJob):
+            self.threats_solved.emit(job.position_id, job.line)
+            return
+        if job.stats is not None:
+            self.search_finished.emit(job.position_id, job.stats)
+        if job.result is not None:
+            row, col, score = job.result
+            self.move_calculated.emit(job.position_id, row, col, score)
 
 
 class PlayerSelectionDialog(QDialog):
@@ -138,11 +174,29 @@ class MainWindow(QMainWindow):
         
         # Game state
         self.board = Board()
-        self.rule_engine = RenjuRuleEngine(self.board)
-        self.evaluator = PositionEvaluator(self.board)
+        self.rule_engine = RenjuRuleEngine(self.board, incremental=True)
+        self.evaluator = PositionEvaluator(self.board, incremental=True)
+        
+        # The book is looked up in this process before a search starts; the
+        # store keeps analysis across sessions and is shared with the engine
+        self.opening_book = OpeningBook.open_default()
+        self.analysis_store = AnalysisStore.open_default()
+        self.win_model = WinProbabilityModel.open_default(self.analysis_store)
         self.player_color = Stone.BLACK
         self.ai_color = Stone.WHITE
-        self.ai_worker: AIWorker = None
+        self.ponder_enabled = True
+        
+        # One engine for the whole session; each search is tagged with the
+        # position it was started for, and the ID changes with every move
+        self.position_id = 0
+        self.ai_worker = AIWorker(self, self.opening_book, self.analysis_store)
+        self.ai_worker.move_calculated.connect(self._on_ai_move_calculated)
+        self.ai_worker.search_finished.connect(self._on_search_finished)
+        self.ai_worker.threats_solved.connect(self._on_threats_solved)
+        self.last_search_stats: Optional[SearchStats] = None
+        self.ai_job: Optional[SearchJob] = None
+        self.ponder_job: Optional[SearchJob] = None
+        self.pending_recommendation = None  # (response so far, stored analysis) while solving
         self.last_probability = 0.5
         
         # Apply dark theme
@@ -228,6 +282,15 @@ class MainWindow(QMainWindow):
         
         toolbar.addSeparator()
         
+        # Think on the player's time
+        ponder_action = QAction("💭 Ponder", self)
+        ponder_action.setCheckable(True)
+        ponder_action.setChecked(self.ponder_enabled)
+        ponder_action.toggled.connect(self._set_pondering)
+        toolbar.addAction(ponder_action)
+        
+        toolbar.addSeparator()
+        
         # Settings (placeholder)
         settings_action = QAction("⚙ Settings", self)
         toolbar.addAction(settings_action)
@@ -253,7 +316,9 @@ class MainWindow(QMainWindow):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
+            self._cancel_search()
             self.board.reset()
+            self.position_id += 1
             self.board_widget.set_forbidden_positions(set())
             self.board_widget.set_recommended_move(None)
             self.board_widget.update()
@@ -302,6 +367,8 @@ class MainWindow(QMainWindow):
         time_taken = time.time() - start_time
         
         if success:
+            self.position_id += 1
+            
             # Update UI
             self.board_widget.update()
             
@@ -359,13 +426,67 @@ class MainWindow(QMainWindow):
         self.sidebar.set_status("Thinking...", "#3b82f6")
         self.statusBar().showMessage("AI is thinking...")
         
-        # Start AI worker thread
-        self.ai_worker = AIWorker(self.board, self.ai_color)
-        self.ai_worker.move_calculated.connect(self._on_ai_move_calculated)
-        self.ai_worker.start()
+        # A correctly predicted reply continues the pondering search;
+        # otherwise the new search supersedes it
+        job = self.ponder_job
+        self.ponder_job = None
+        if job is not None:
+            last = self.board.move_history[-1] if self.board.move_history else None
+            if last is not None and (last.row, last.col) == job.ponder_move:
+                self.ai_job = job
+                self.ai_worker.ponderhit(job, self.position_id)
+                return
+        
+        self.ai_job = self.ai_worker.search(self.position_id, self.board, self.ai_color)
+    
+    def _start_pondering(self):
+        """Search the AI's answer to the player's most likely reply."""
+        if not self.ponder_enabled or self.board.game_over:
+            return
+        
+        reply = self.ai_job.predicted_reply if self.ai_job is not None else None
+        if reply is None:
+            for row, col, _ in self.evaluator.get_best_moves(self.player_color, top_n=5):
+                if not (self.player_color == Stone.BLACK
+                        and self.rule_engine.is_forbidden_move(row, col, self.player_color)):
+                    reply = (row, col)
+                    break
+        if reply is None:
+            return
+        
+        self.ponder_job = self.ai_worker.search(self.position_id, self.board, self.ai_color,
+                                                ponder_move=reply)
+    
+    def _cancel_search(self):
+        """Cancel the AI's search and any pondering."""
+        self.ai_worker.cancel()
+        self.ai_job = None
+        self.ponder_job = None
     
-    def _on_ai_move_calculated(self, row: int, col: int, score: int):
+    def _set_pondering(self, enabled: bool):
+        """Turn pondering on or off."""
+        self.ponder_enabled = enabled
+        if not enabled and self.ponder_job is not None:
+            self.ai_worker.cancel(self.ponder_job)
+            self.ponder_job = None
+    
+    def _on_search_finished(self, position_id: int, stats: SearchStats):
+        """Keep the statistics of the search for the current position."""
+        if position_id != self.position_id:
+            return
+        self.last_search_stats = stats
+        
+        # The score also gives the win probability here and after the move
+        if stats.move is not None and stats.source != 'book':
+            row, col, score = stats.move
+            self.win_model.record(self.board, self.board.current_player, score, (row, col))
+    
+    def _on_ai_move_calculated(self, position_id: int, row: int, col: int, score: int):
         """Handle AI move calculation completion."""
+        # Results for a position that has since changed are stale
+        if position_id != self.position_id or self.board.current_player != self.ai_color:
+            return
+        
         self.sidebar.set_status("Ready", "#10b981")
         
         # Make the move
@@ -386,13 +507,24 @@ class MainWindow(QMainWindow):
         
         self.sidebar.set_ai_message(message)
         
+        # The search behind the move
+        stats = self.last_search_stats
+        self.last_search_stats = None
+        if stats is not None:
+            self.statusBar().showMessage(f"Move {len(self.board.move_history)}: {coord} ({stats.summary()})")
+        
         # Check for game over
         if self.board.game_over:
             self._handle_game_over()
+        else:
+            self._start_pondering()
     
     def _update_win_probability(self):
         """Update the win probability display."""
-        prob = self.evaluator.calculate_win_probability(Stone.BLACK)
+        # The latest search score when there is one; the incremental
+        # evaluator's score otherwise
+        prob, _ = self.win_model.probability(self.board, self.evaluator)
+        
         trend = (prob - self.last_probability) * 100
         
         if self.board.current_player == Stone.BLACK:
@@ -409,7 +541,11 @@ class MainWindow(QMainWindow):
     
     def _undo_move(self):
         """Undo the last move."""
+        self._cancel_search()
+        self.sidebar.set_status("Ready", "#10b981")
         if self.board.undo_move():
+            self.position_id += 1
+            
             # If AI just moved, undo one more time to undo player's move
             if self.board.current_player == self.ai_color:
                 self.board.undo_move()
@@ -432,23 +568,80 @@ class MainWindow(QMainWindow):
             response += "Forbidden moves are marked with red X on the board. "
             response += "Black cannot make 3-3, 4-4, or overline moves."
         elif "recommend" in question.lower() or "best" in question.lower():
-            # Get best moves
-            best_moves = self.evaluator.get_best_moves(self.player_color, top_n=3)
-            if best_moves:
-                response += "Top recommended moves: "
-                for i, (r, c, s) in enumerate(best_moves[:3]):
-                    from core.board import Move
-                    coord = Move(r, c, self.player_color, 0).to_coordinate()
-                    response += f"{coord} (score: {s})"
-                    if i < len(best_moves) - 1:
-                        response += ", "
+            # A proven forced win beats any heuristic recommendation
+            to_move = not self.board.game_over and self.board.current_player == self.player_color
+            stored = None
+            if to_move and self.analysis_store is not None:
+                stored = self.analysis_store.lookup(self.board, self.player_color)
+                if stored is not None and (stored.move is None or not self.board.is_empty(*stored.move)):
+                    stored = None
+            
+            if stored is not None and stored.solver == ProofNumberSearch.WIN:
+                coord = Move(*stored.move, self.player_color, 0).to_coordinate()
+                self.board_widget.set_recommended_move(stored.move)
+                response += f"You have a forced win starting with {coord}."
+                self.sidebar.set_ai_message(response)
+                return
+            
+            # The threat search runs on the engine thread and answers in _on_threats_solved
+            if to_move:
+                self.ponder_job = None
+                self.pending_recommendation = (response, stored)
+                self.ai_worker.solve(self.position_id, self.board, self.player_color)
+                self.sidebar.set_ai_message(response + "Looking for a forced win...")
+                return
+            
+            response += self._recommendation(stored)
         else:
             response += "I'm here to help you improve your game. Ask me about forbidden moves, best moves, or strategy!"
         
         self.sidebar.set_ai_message(response)
     
+    def _on_threats_solved(self, position_id: int, winning_line):
+        """Finish a recommendation once the threat search is done."""
+        if position_id != self.position_id or self.pending_recommendation is None:
+            return
+        response, stored = self.pending_recommendation
+        self.pending_recommendation = None
+        
+        if winning_line:
+            coords = []
+            for i, (r, c) in enumerate(winning_line):
+                stone = self.player_color if i % 2 == 0 else self.ai_color
+                coords.append(Move(r, c, stone, 0).to_coordinate())
+            self.board_widget.set_recommended_move(winning_line[0])
+            response += f"You have a forced win starting with {coords[0]}: "
+            response += " → ".join(coords)
+        else:
+            response += self._recommendation(stored)
+        self.sidebar.set_ai_message(response)
+        
+        # The solve superseded any pondering
+        self._start_pondering()
+    
+    def _recommendation(self, stored) -> str:
+        """Recommended moves from stored engine analysis and the evaluator."""
+        response = ""
+        
+        # A previous engine search of this position
+        if stored is not None and stored.depth > 0:
+            coord = Move(*stored.move, self.player_color, 0).to_coordinate()
+            response += f"Engine analysis (depth {stored.depth}) prefers {coord} (score: {stored.score}). "
+        
+        # Get best moves
+        best_moves = self.evaluator.get_best_moves(self.player_color, top_n=3)
+        if best_moves:
+            response += "Top recommended moves: "
+            for i, (r, c, s) in enumerate(best_moves[:3]):
+                coord = Move(r, c, self.player_color, 0).to_coordinate()
+                response += f"{coord} (score: {s})"
+                if i < len(best_moves) - 1:
+                    response += ", "
+        return response
+    
     def _handle_game_over(self):
         """Handle game over."""
+        self._cancel_search()
         winner_name = "Black" if self.board.winner == Stone.BLACK else "White"
         
         if self.board.winner == self.player_color:
@@ -461,3 +654,12 @@ class MainWindow(QMainWindow):
         self.statusBar().showMessage(message)
         
         QMessageBox.information(self, "Game Over", message)
+    
+    def closeEvent(self, event):
+        """Stop the engine, then release the book and the store it was using."""
+        self.ai_worker.shutdown()
+        if self.opening_book is not None:
+            self.opening_book.close()
+        if self.analysis_store is not None:
+            self.analysis_store.close()
+        super().closeEvent(event)